@@ -0,0 +1,142 @@
+"""
+JSONDict/JSONList attribute access micro-benchmark.
+
+Attribute-heavy loops (like the ones of search, show and the game version
+filters) are run over a synthetic catalogue of 10k mods, with the
+JSONDict and JSONList views of fac.utils and with the previous
+UserDict/UserList-based ones (which allocated a new wrapper on every
+access).
+
+Usage: python benchmarks/jsonviews.py [-m MODS] [-n RUNS]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+from collections import UserDict, UserList
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fac.utils import JSONDict  # noqa: E402
+
+
+class OldJSONList(UserList):
+    def __init__(self, data=None):
+        self.data = [] if data is None else data
+
+    def __getitem__(self, i):
+        return _old_wrap(self.data[i])
+
+
+class OldJSONDict(UserDict):
+    data = None
+
+    def __init__(self, data=None):
+        self.data = {} if data is None else data
+
+    def __getattr__(self, name):
+        try:
+            return super().__getattribute__(name)
+        except AttributeError as ex:
+            try:
+                return _old_wrap(self.data[name])
+            except KeyError:
+                raise ex
+
+
+def _old_wrap(obj):
+    if isinstance(obj, dict):
+        return OldJSONDict(obj)
+    elif isinstance(obj, list):
+        return OldJSONList(obj)
+    else:
+        return obj
+
+
+def make_catalogue(mods, seed=0):
+    rnd = random.Random(seed)
+    catalogue = []
+
+    for i in range(mods):
+        releases = [{
+            'version': '0.%d.%d' % (i % 5, j),
+            'file_name': 'mod%d_0.%d.%d.zip' % (i, i % 5, j),
+            'info_json': {
+                'factorio_version': rnd.choice(['0.14', '0.15', '0.16']),
+            },
+        } for j in range(rnd.randint(1, 10))]
+
+        catalogue.append({
+            'name': 'mod%d' % i,
+            'title': 'Mod %d' % i,
+            'owner': 'owner%d' % (i % 100),
+            'summary': 'Summary of mod %d' % i,
+            'downloads_count': rnd.randint(0, 100000),
+            'latest_release': releases[-1],
+            'releases': releases,
+        })
+
+    # Same layout as data read from the database
+    return json.loads(json.dumps(catalogue))
+
+
+def attribute_loops(mods, wrap):
+    count = 0
+
+    for data in mods:
+        mod = wrap(data)
+
+        # search results / show
+        line = '%s %s %s %s' % (mod.name, mod.title, mod.owner,
+                                mod.latest_release.version)
+        if mod.latest_release.info_json.factorio_version == '0.15':
+            count += len(line)
+
+        # release filters, usually done more than once per mod
+        for i in range(3):
+            for release in mod.releases:
+                if release.info_json.factorio_version == '0.15':
+                    count += len(release.version)
+
+    return count
+
+
+def measure(mods, wrap, runs):
+    times = []
+    for i in range(runs):
+        start = time.perf_counter()
+        attribute_loops(mods, wrap)
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-m', '--mods', type=int, default=10000)
+    parser.add_argument('-n', '--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    mods = make_catalogue(args.mods)
+    assert (attribute_loops(mods, OldJSONDict) ==
+            attribute_loops(mods, JSONDict))
+
+    print("%d mods, %d releases" % (
+        len(mods), sum(len(mod['releases']) for mod in mods)
+    ))
+    print()
+
+    old = measure(mods, OldJSONDict, args.runs)
+    new = measure(mods, JSONDict, args.runs)
+
+    print("%-20s %10s %10s" % ("implementation", "time", "speedup"))
+    print("%-20s %8.1fms %9.1fx" % ("UserDict", old, 1))
+    print("%-20s %8.1fms %9.1fx" % ("slots + cache", new, old / new))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Startup time budget of common fac invocations.
+
+Each command is run several times in a throwaway Factorio setup using
+`python -X importtime`. The time spent importing modules (after the
+interpreter startup) is compared to a budget, in milliseconds.
+
+The throwaway setup relies on the XDG environment variables, so this only
+works on Linux.
+
+Usage: python benchmarks/startup.py [-n RUNS]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BUDGETS = [
+    # (arguments, budget in ms)
+    (['--help'], 30),
+    (['list'], 80),
+    # used by the zsh completion
+    (['list', '-F', '{mod.name}\n{mod.info.title}'], 80),
+]
+
+
+def setup_factorio(root):
+    data = os.path.join(root, 'data')
+    write = os.path.join(root, 'write')
+
+    for path in (os.path.join(data, 'base'),
+                 os.path.join(write, 'config'),
+                 os.path.join(write, 'mods'),
+                 os.path.join(root, 'config', 'fac')):
+        os.makedirs(path)
+
+    with open(os.path.join(data, 'base', 'info.json'), 'w') as f:
+        json.dump({'version': '0.15.0'}, f)
+
+    with open(os.path.join(root, 'config', 'fac', 'config.ini'), 'w') as f:
+        f.write('[paths]\ndata-path = %s\nwrite-path = %s\n' % (data, write))
+
+    env = dict(os.environ)
+    env['XDG_CONFIG_HOME'] = os.path.join(root, 'config')
+    env['XDG_CACHE_HOME'] = os.path.join(root, 'cache')
+    env['PYTHONPATH'] = ROOT
+    return env
+
+
+def import_time(output):
+    """Total import time (in ms) of the modules imported after `site`"""
+
+    total = 0
+    after_site = False
+
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        _, cumulative, name = line.split('|')
+
+        if name.strip() == 'site':
+            after_site = True
+        elif after_site and not name.startswith('  '):
+            # only count top-level imports
+            total += int(cumulative)
+
+    return total / 1000
+
+
+def measure(args, env, runs):
+    imports = []
+    walls = []
+
+    for i in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'fac.main'] + args,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        walls.append((time.perf_counter() - start) * 1000)
+        imports.append(import_time(proc.stderr))
+
+    return min(imports), min(walls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    ok = True
+
+    with tempfile.TemporaryDirectory() as root:
+        env = setup_factorio(root)
+
+        print("%-40s %10s %10s %10s" % (
+            "command", "imports", "wall", "budget"
+        ))
+
+        for command, budget in BUDGETS:
+            imports, wall = measure(command, env, args.runs)
+            status = "ok" if imports <= budget else "OVER"
+            ok = ok and imports <= budget
+
+            print("%-40s %8.1fms %8.1fms %8dms %s" % (
+                'fac ' + ' '.join(command).replace('\n', r'\n'),
+                imports, wall, budget, status
+            ))
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
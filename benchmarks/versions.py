@@ -0,0 +1,180 @@
+"""
+Version parsing micro-benchmark.
+
+A synthetic catalogue (about the size of the mod portal) is processed the
+way `fac` does it: releases of each mod are filtered by game version and
+sorted, and the dependencies of each release are parsed.
+
+The uncached implementations (a new Version for every release and every
+sort key) are compared to the cached parsing functions of fac.utils,
+with a cold cache (first run of a command) and a warm one.
+
+Releases are plain dicts here, so that only the parsing is measured.
+
+Usage: python benchmarks/versions.py [-m MODS] [-n RUNS]
+"""
+
+import gc
+import os
+import sys
+import time
+import random
+import argparse
+
+from packaging.specifiers import SpecifierSet
+from packaging.version import Version
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fac.utils import (REQUIREMENT_RE,  # noqa: E402
+                       parse_version, parse_specifier, parse_requirement,
+                       parse_major_version, match_game_version,
+                       sort_releases)
+
+CACHES = (parse_version, parse_specifier, parse_major_version)
+
+GAME_VERSIONS = ['0.12', '0.13', '0.14', '0.15', '0.16']
+
+
+def make_catalogue(mods, seed=0):
+    rnd = random.Random(seed)
+    catalogue = []
+
+    for i in range(mods):
+        releases = []
+        major, minor, patch = 0, rnd.randint(0, 3), 0
+        game = rnd.randint(0, 2)
+
+        for j in range(rnd.randint(1, 20)):
+            patch += rnd.randint(1, 3)
+            if rnd.random() < 0.2:
+                minor, patch = minor + 1, 0
+            if rnd.random() < 0.1:
+                game = min(game + 1, len(GAME_VERSIONS) - 1)
+
+            deps = ['base >= %s.0' % GAME_VERSIONS[game]]
+            deps += ['mod%d >= 0.%d.0' % (rnd.randrange(mods),
+                                          rnd.randint(0, 3))
+                     for k in range(rnd.randint(0, 3))]
+
+            releases.append({
+                'version': '%d.%d.%d' % (major, minor, patch),
+                'info_json': {
+                    'factorio_version': GAME_VERSIONS[game],
+                    'dependencies': deps,
+                },
+            })
+
+        rnd.shuffle(releases)
+        catalogue.append({'name': 'mod%d' % i, 'releases': releases})
+
+    return catalogue
+
+
+def old_parse_requirement(text):
+    match = REQUIREMENT_RE.match(text)
+    return match.group('name').strip(), SpecifierSet(
+        match.group('specifier') or ''
+    )
+
+
+def old_game_version(release):
+    version = release['info_json']['factorio_version']
+    return Version('.'.join(version.split('.')[:2]))
+
+
+def run_old(catalogue, game_version):
+    game_version = Version(game_version)
+
+    for mod in catalogue:
+        releases = [release for release in mod['releases']
+                    if old_game_version(release) == game_version]
+        releases.sort(key=lambda r: Version(r['version']), reverse=True)
+
+        for release in releases:
+            for dep in release['info_json']['dependencies']:
+                name, spec = old_parse_requirement(dep)
+
+
+def run_new(catalogue, game_version):
+    game_version = parse_version(game_version)
+
+    for mod in catalogue:
+        releases = sort_releases([release for release in mod['releases']
+                                  if match_game_version(release,
+                                                        game_version)])
+
+        for release in releases:
+            for dep in release['info_json']['dependencies']:
+                name, spec = parse_requirement(dep)
+
+
+def clear_caches():
+    for func in CACHES:
+        func.cache_clear()
+
+
+def measure(cases, catalogue, runs):
+    """
+    Return the best time of each (name, func, cold) case.
+
+    The cases are run in turn on each round, so that a change of the
+    machine load affects all of them alike.
+    """
+
+    times = {name: [] for name, func, cold in cases}
+
+    # The garbage collector would run at random points of the loops
+    gc.collect()
+    gc.disable()
+
+    try:
+        for i in range(runs):
+            for name, func, cold in cases:
+                if cold:
+                    clear_caches()
+                start = time.perf_counter()
+                func(catalogue, '0.15')
+                times[name].append((time.perf_counter() - start) * 1000)
+    finally:
+        gc.enable()
+
+    return [(name, min(times[name])) for name, func, cold in cases]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-m', '--mods', type=int, default=6000)
+    parser.add_argument('-n', '--runs', type=int, default=7)
+    args = parser.parse_args()
+
+    catalogue = make_catalogue(args.mods)
+    releases = sum(len(mod['releases']) for mod in catalogue)
+
+    print("%d mods, %d releases" % (len(catalogue), releases))
+    print()
+
+    results = measure([
+        ('uncached', run_old, False),
+        ('cached (cold)', run_new, True),
+        ('cached (warm)', run_new, False),
+    ], catalogue, args.runs)
+    old = results[0][1]
+
+    print("%-20s %10s %10s" % ("implementation", "time", "speedup"))
+    for name, value in results:
+        print("%-20s %8.1fms %9.1fx" % (name, value, old / value))
+
+    # A cache that is too small for the catalogue would have many misses
+    # on the warm runs
+    print()
+    print("%-20s %10s %10s %10s" % ("cache", "hits", "misses", "size"))
+    for func in CACHES:
+        info = func.cache_info()
+        print("%-20s %10d %10d %10d" % (func.__name__, info.hits,
+                                        info.misses, info.currsize))
+
+
+if __name__ == '__main__':
+    main()
@@ -9,46 +9,104 @@ import requests
 from requests.packages.urllib3.util import Retry
 from requests.adapters import HTTPAdapter
 
-from fac.utils import JSONDict, JSONList
+from fac.utils import JSONDict, JSONList, iter_json_array
 from fac.errors import ModNotFoundError, AuthError, OwnershipError
 
 BASE_URL = 'https://mods.factorio.com/api/'
 LOGIN_URL = 'https://auth.factorio.com/api-login'
 DEFAULT_PAGE_SIZE = 25
+DEFAULT_POOL_SIZE = 10
+STREAM_CHUNK_SIZE = 16 * 1024
 
 
 class API:
-    def __init__(self, base_url=BASE_URL, login_url=LOGIN_URL, session=None):
+    def __init__(self, base_url=BASE_URL, login_url=LOGIN_URL, session=None,
+                 pool_size=DEFAULT_POOL_SIZE, cache=None):
         self.base_url = base_url
+        self.cache = cache
         self.login_url = login_url
         self.url = base_url.rstrip('/') + '/mods'
         self.session = session or requests.session()
-        adapter = HTTPAdapter(max_retries=Retry(status_forcelist=[500, 503]))
+        # The session is shared by the download workers so the pool
+        # must be large enough to keep one connection per worker.
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(status_forcelist=[500, 503]),
+        )
         self.session.mount('https://', adapter)
         self.session.mount('http://', adapter)
 
     def get_mods(self, progress=None, page_size='max'):
+        return JSONList([mod.data
+                         for mod in self.iter_mods(progress, page_size)])
+
+    def iter_mods(self, progress=None, page_size='max'):
+        """
+        Yield the mods from the mods list one at a time.
+
+        The response is parsed as it is received, so that the whole
+        list never needs to be held in memory.
+        """
+
         resp = self.get(self.url, params=dict(page_size=page_size),
                         stream=True)
         resp.raise_for_status()
         content_length = int(resp.headers['content-length'])
-        data = bytearray()
 
-        for chunk in resp.iter_content(chunk_size=1024):
-            data.extend(chunk)
-            if progress:
-                progress(resp.raw.tell(), content_length)
+        def chunks():
+            for chunk in resp.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                yield chunk
+                if progress:
+                    progress(resp.raw.tell(), content_length)
+
+        try:
+            for mod in iter_json_array(chunks(), 'results'):
+                yield JSONDict(mod)
+        finally:
+            resp.close()
+
+    def iter_mod_pages(self, page_size=DEFAULT_PAGE_SIZE, **params):
+        """Yield the mods list page by page, following pagination links"""
+
+        url = self.url
+        params = dict(params, page_size=page_size)
 
-        return JSONList(json.loads(data.decode('utf-8'))['results'])
+        while url:
+            resp = self.get(url, params=params)
+            resp.raise_for_status()
+            data = resp.json()
+
+            yield JSONList(data['results'])
+
+            # the next link already includes the query parameters
+            url = data.get('pagination', {}).get('links', {}).get('next')
+            params = None
 
     @lru_cache()
     def get_mod(self, mod_name):
-        resp = self.session.get('%s/%s' % (self.url, quote(mod_name)))
-        if resp.status_code == 404:
+        url = '%s/%s' % (self.url, quote(mod_name))
+        entry = self.cache.get(url) if self.cache else None
+
+        if entry and self.cache.is_fresh(entry):
+            return JSONDict(json.loads(entry['content']))
+
+        resp = self.session.get(
+            url,
+            headers=self.cache.conditional_headers(entry) if entry else None
+        )
+
+        if entry and resp.status_code == 304:
+            self.cache.refresh(url, entry)
+            return JSONDict(json.loads(entry['content']))
+        elif resp.status_code == 404:
             raise ModNotFoundError(mod_name)
         else:
             resp.raise_for_status()
 
+        if self.cache:
+            self.cache.store(url, resp)
+
         return JSONDict(resp.json())
 
     def login(self, username, password, require_ownership=False):
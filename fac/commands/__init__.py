@@ -14,6 +14,14 @@ class CommandRegistry(type):
         elif 'name' in dict:
             CommandRegistry.commands.append(cls)
 
+    @classmethod
+    def find(mcs, name):
+        """Return the (already imported) command class with this name"""
+
+        for command_class in mcs.commands:
+            if command_class.name == name:
+                return command_class
+
 
 class Command(metaclass=CommandRegistry):
     arguments = ()
@@ -23,9 +31,15 @@ class Command(metaclass=CommandRegistry):
 
     def __init__(self, manager):
         self.manager = manager
-        self.api = manager.api
         self.config = manager.config
-        self.db = manager.db
+
+    @property
+    def api(self):
+        return self.manager.api
+
+    @property
+    def db(self):
+        return self.manager.db
 
     def create_parser(self, subparser, parents):
         doc = self.__doc__ or ""
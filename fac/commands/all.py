@@ -1,13 +1,31 @@
-# flake8: noqa
-import fac.commands
-import fac.commands.list
-import fac.commands.enable
-import fac.commands.search
-import fac.commands.show
-import fac.commands.install
-import fac.commands.update
-import fac.commands.remove
-import fac.commands.hold
-import fac.commands.pack
-import fac.commands.fetch
-import fac.commands.make_compatible
+"""
+List of the available commands.
+
+Only the names and help strings of the commands are listed here, so that
+a command module is only imported when that command is run.
+"""
+
+COMMANDS = [
+    # (name, module, help)
+    ('list', 'fac.commands.list',
+     "List installed mods and their status."),
+    ('enable', 'fac.commands.enable', "Enable mods."),
+    ('disable', 'fac.commands.enable', "Disable mods."),
+    ('search', 'fac.commands.search', "Search the mods database."),
+    ('show', 'fac.commands.show', "Show details about specific mods."),
+    ('install', 'fac.commands.install', "Install (or update) mods."),
+    ('update', 'fac.commands.update', "Update installed mods."),
+    ('outdated', 'fac.commands.outdated',
+     "List installed mods having a more recent release."),
+    ('remove', 'fac.commands.remove', "Remove mods."),
+    ('hold', 'fac.commands.hold',
+     "Hold mods (show held mods with no argument)."),
+    ('unhold', 'fac.commands.hold', "Unhold mods."),
+    ('pack', 'fac.commands.pack', "Pack mods."),
+    ('unpack', 'fac.commands.pack', "Unpack mods."),
+    ('fetch', 'fac.commands.fetch', "Fetch a mod from the mod portal."),
+    ('make-compatible', 'fac.commands.make_compatible',
+     "Change the supported factorio version of mods."),
+    ('cache', 'fac.commands.cache',
+     "Manage the cache of downloaded releases."),
+]
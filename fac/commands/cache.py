@@ -0,0 +1,116 @@
+import os
+
+from fac.commands import Command, Arg
+from fac.httpcache import ResponseCache
+from fac.releasestore import ReleaseStore, describe_removal
+from fac.utils import prompt, format_size, parse_size
+
+
+class CacheCommand(Command):
+    """
+    Manage the cache of downloaded releases.
+
+    Downloaded releases are kept in a store shared by all the mods
+    directories, and installed from there as hard links. Releases that are
+    not used by any of these mods directories are evicted (least recently
+    installed first) when the store grows over `store_size`, and partial
+    downloads are removed after `partial_max_age` seconds. This is done
+    automatically after installing mods, at most once every `gc_interval`
+    seconds (see the [cache] section of the config file).
+    """
+
+    name = 'cache'
+
+
+def api_cache(config):
+    return ResponseCache(os.path.join(config.cache_dir, 'api'))
+
+
+class CacheStatsCommand(Command):
+    """Show the disk usage of the cache."""
+
+    name = 'stats'
+    parent = CacheCommand
+
+    def run(self, args):
+        store = ReleaseStore.from_config(self.config)
+        entries = store.entries()
+        used = store.referenced(entries)
+        partial_files = store.partial_files()
+        responses = api_cache(self.config).entries()
+
+        print("Release store: %s" % store.directory)
+        print("    Releases: %d (%s), %d used by installed mods" % (
+            len(entries), format_size(sum(e.size for e in entries)),
+            len(used)
+        ))
+        print("    Size limit: %s" % (
+            format_size(store.size_limit) if store.size_limit else "none"
+        ))
+        print("    Partial downloads: %d (%s)" % (
+            len(partial_files),
+            format_size(sum(size for path, size, mtime in partial_files))
+        ))
+        print("    Mods directories: %d" % len(store.mods_directories))
+
+        print("API cache: %s" % api_cache(self.config).directory)
+        print("    Responses: %d (%s)" % (
+            len(responses),
+            format_size(sum(size for mtime, size, path in responses))
+        ))
+
+
+class CacheGCCommand(Command):
+    """Remove unused releases and stale partial downloads."""
+
+    name = 'gc'
+    parent = CacheCommand
+
+    arguments = [
+        Arg('-s', '--max-size', type=parse_size,
+            help="size limit of the store (default: store_size setting)"),
+    ]
+
+    def run(self, args):
+        store = ReleaseStore.from_config(self.config)
+        print(describe_removal(store.gc(args.max_size)))
+
+
+class CacheClearCommand(Command):
+    """
+    Remove all cached releases and API responses.
+
+    Partial downloads are only removed when older than `partial_max_age`
+    seconds, as they may belong to a download in progress.
+    """
+
+    name = 'clear'
+    parent = CacheCommand
+
+    arguments = [
+        Arg('-y', '--yes', action='store_true',
+            help="automatic yes to confirmation prompt"),
+    ]
+
+    def run(self, args):
+        store = ReleaseStore.from_config(self.config)
+
+        print("This will remove all the files in %s and %s." % (
+            store.directory, api_cache(self.config).directory
+        ))
+        print("Installed mods will not be affected.")
+
+        if not args.yes and prompt("Continue?", "Y/n") != "y":
+            return
+
+        print(describe_removal(store.clear()))
+
+        cache = api_cache(self.config)
+        responses = cache.entries()
+        for mtime, size, path in responses:
+            os.remove(path)
+
+        print("Removed %d API responses (%s freed)" % (
+            len(responses),
+            format_size(sum(size for mtime, size, path in responses))
+        ))
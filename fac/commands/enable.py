@@ -10,7 +10,11 @@ class EnableDisableCommand(Command):
     def run(self, args):
         enabled = self.name == 'enable'
 
-        for mod_pattern in args.mods:
+        with self.manager.transaction():
+            self.set_enabled(args.mods, enabled)
+
+    def set_enabled(self, patterns, enabled):
+        for mod_pattern in patterns:
             try:
                 mod_name = self.manager.resolve_mod_name(mod_pattern)
             except ModNotFoundError as e:
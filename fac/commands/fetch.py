@@ -2,6 +2,7 @@ import os.path
 
 from fac.commands import Command, Arg
 from fac.errors import ModNotFoundError
+from fac.mods import ZippedMod
 from fac.utils import parse_requirement, Requirement
 
 
@@ -39,6 +40,8 @@ class FetchCommand(Command):
     ]
 
     def run(self, args):
+        downloads = []
+
         for req in args.requirements:
             name, spec = parse_requirement(req)
 
@@ -70,7 +73,15 @@ class FetchCommand(Command):
                 os.makedirs(args.dest)
 
             print("Saving to: %s" % file_path)
-            mod = self.manager.download_mod(release, file_path)
+            downloads.append((release, file_path))
+
+        if not downloads:
+            return
+
+        errors = self.manager.download_mods(downloads)
 
-            if args.unpack:
-                mod.unpack(replace=args.replace, keep=args.keep)
+        if args.unpack:
+            for (release, file_path), error in zip(downloads, errors):
+                if not error:
+                    mod = ZippedMod(self.manager, file_path)
+                    mod.unpack(replace=args.replace, keep=args.keep)
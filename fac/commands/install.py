@@ -1,6 +1,10 @@
+from packaging.specifiers import SpecifierSet
+
 from fac.commands import Command, Arg
-from fac.errors import ModNotFoundError
-from fac.utils import parse_requirement, start_iter, Requirement, Version
+from fac.errors import ModNotFoundError, ResolutionError
+from fac.resolver import Resolver
+from fac.utils import (parse_requirement, parse_version, start_iter,
+                       Requirement)
 
 
 class InstallCommand(Command):
@@ -17,6 +21,9 @@ class InstallCommand(Command):
     If the version is not specified, the latest version will be selected.
 
     Outdated versions will be replaced.
+
+    Missing dependencies are resolved along with the requested mods, before
+    anything is downloaded.
     """
     name = 'install'
 
@@ -41,15 +48,16 @@ class InstallCommand(Command):
             help="do not install any dependencies"),
     ]
 
-    def install(self, args, name, release):
-        print("Installing: %s %s..." % (
-            name, release.version
-        ))
+    def install(self, args, to_install):
+        for name, release in to_install:
+            print("Installing: %s %s..." % (
+                name, release.version
+            ))
 
-        self.manager.install_mod(name, release, unpack=args.unpack)
+        return self.manager.install_mods(to_install, unpack=args.unpack)
 
     def run(self, args):
-        to_install = []
+        requirements = []
 
         for req in args.requirements:
             name, spec = parse_requirement(req)
@@ -76,7 +84,7 @@ class InstallCommand(Command):
             for release in releases:
                 if local_mod:
                     local_ver = local_mod.version
-                    release_ver = Version(release.version)
+                    release_ver = parse_version(release.version)
 
                     if not args.reinstall and release_ver == local_ver:
                         print("%s==%s is already installed. "
@@ -93,74 +101,63 @@ class InstallCommand(Command):
                         )
                         break
 
-                to_install.append((name, release))
+                    # Don't let the resolver pick a version that would
+                    # have been refused here
+                    if not args.reinstall:
+                        spec &= SpecifierSet('!=%s' % local_ver)
+
+                    if not args.downgrade:
+                        spec &= SpecifierSet('>=%s' % local_ver)
+
+                requirements.append(Requirement(name, spec))
                 break
             else:
                 print("No match found for %s" % (req,))
                 continue
 
-        for name, release in to_install:
-            self.install(args, name, release)
-
-        if not args.no_deps:
-            self.install_deps(args)
-
-    def install_deps(self, args):
-        deps = []
-
-        for mod in self.manager.find_mods():
-            try:
-                deps += mod.info.dependencies
-            except AttributeError:
-                pass
-
-        deps_to_install = []
-        deps_ok = True
+        if not requirements and args.no_deps:
+            return
 
-        for dep in deps:
-            depreq = parse_requirement(dep)
+        self.install_plan(args, requirements)
 
-            if depreq.name == 'base':
-                continue  # ignore it since it's not like we can install it
+    def install_plan(self, args, requirements):
+        requested = set(req.name for req in requirements)
+        warnings = []
 
-            if depreq.name.startswith('?'):
-                continue  # ignore optional dependency
+        while True:
+            resolver = Resolver(
+                self.manager,
+                ignore_game_ver=args.ignore_game_ver,
+                held=() if args.held else self.config.hold,
+            )
 
-            if self.manager.resolve_local_requirement(
-                    depreq,
-                    ignore_game_ver=args.ignore_game_ver):
-                continue
             try:
-                # FIXME: we only try the first release here
-                release = next(
-                    self.manager.resolve_remote_requirement(
-                        depreq,
-                        ignore_game_ver=args.ignore_game_ver
-                    )
-                )
-            except ModNotFoundError:
-                print("Dependency not found: %s" % depreq.name)
-                deps_ok = False
-                break
+                plan = resolver.resolve(requirements, deps=not args.no_deps)
+            except ResolutionError as ex:
+                print("Error: %s" % ex)
+                return
 
-            if not release:
-                print("Dependency can not be met: %s" % depreq)
-                deps_ok = False
-                break
+            for warning in resolver.warnings:
+                if warning not in warnings:
+                    print("Warning: %s" % warning)
+                    warnings.append(warning)
 
-            if (depreq.name, release) not in deps_to_install:
-                print("Adding dependency: %s %s" % (
-                    depreq.name, release.version
-                ))
-                deps_to_install.append((depreq.name, release))
+            if not plan:
+                return
 
-        if not deps_ok:
-            return
+            for name, release in plan:
+                if name not in requested:
+                    print("Adding dependency: %s %s" % (
+                        name, release.version
+                    ))
+
+            if self.install(args, plan):
+                print("Some mods could not be installed")
+                return
 
-        if deps_to_install:
-            print("Installing missing dependencies...")
-            for name, release in deps_to_install:
-                self.install(args, name, release)
+            if args.no_deps:
+                return
 
-            # we may have added new sub-dependencies
-            self.install_deps(args)
+            # The portal may not list the dependencies of every release:
+            # check the dependencies of the newly installed mods.
+            requirements = []
@@ -8,13 +8,17 @@ class MakeCompatibleCommand(Command):
     This modifies the `factorio_version` field in the mods' info.json file
     to make them compatible with the current game version.
 
-    Packed mods will be unpacked first.
+    Packed mods are modified inside their zip file (the other files of
+    the archive are copied without being recompressed), unless -U is used
+    in which case they will be unpacked first.
     Unpacked mods will be modified in place.
     """
 
     name = 'make-compatible'
     arguments = [
         Arg('mods', nargs='+', help="mods patterns to affect"),
+        Arg('-U', '--unpack', action='store_true',
+            help="unpack packed mods instead of modifying their zip file"),
     ]
 
     def run(self, args):
@@ -22,7 +26,7 @@ class MakeCompatibleCommand(Command):
         for mod_pattern in args.mods:
             mod_pattern = self.manager.resolve_mod_name(mod_pattern)
             mods = [
-                mod.unpack(replace=False)
+                mod
                 for mod in self.manager.find_mods(mod_pattern)
                 if mod.game_version != game_ver
             ]
@@ -32,8 +36,12 @@ class MakeCompatibleCommand(Command):
                 continue
 
             for mod in mods:
+                if mod.packed and not args.unpack:
+                    mod.update_info(factorio_version=str(game_ver))
+                else:
+                    mod = mod.unpack(replace=False)
+                    mod.info.factorio_version = str(game_ver)
+                    mod.info.save()
+
                 print("Game version changed to %s for %s %s." % (
                     game_ver, mod.name, mod.version))
-
-                mod.info.factorio_version = game_ver
-                mod.info.save()
@@ -0,0 +1,163 @@
+import json
+
+from fac.commands import Command, Arg
+from fac.utils import JSONDict, parse_version, match_game_version
+
+
+class OutdatedCommand(Command):
+    """
+    List installed mods having a more recent release.
+
+    Installed mods are compared to the latest releases found in the mods
+    database, without contacting the mod portal. Only when the latest
+    release of a mod is for another game version, the releases of that
+    mod are fetched from the portal (concurrently).
+    """
+
+    name = 'outdated'
+
+    arguments = [
+        Arg('-j', '--json', action='store_true',
+            help="output a JSON report"),
+
+        Arg('-S', '--sync', help="Force database sync",
+            action='store_true',
+            default=None,
+            dest='sync'),
+
+        Arg('--no-sync', help="Don't sync database even if it's out of date",
+            action='store_false',
+            default=None,
+            dest='sync'),
+    ]
+
+    epilog = """
+    JSON REPORT
+
+    With -j, a JSON object is printed with the following keys:
+        game_version  game version used to select the releases
+        outdated      number of outdated mods
+        mods          list of installed mods, with the following keys:
+            name, version, enabled, packed, held
+            latest    most recent compatible release (null if unknown)
+            outdated  true if the latest release is more recent
+            error     set if the releases could not be retrieved
+    """
+
+    def run(self, args):
+        if args.sync is None:
+            self.db.maybe_update()
+        elif args.sync:
+            self.db.update()
+
+        if args.ignore_game_ver:
+            game_ver = None
+        else:
+            game_ver = self.config.game_version_major
+
+        report = self.check(self.manager.find_mods(), game_ver)
+
+        if args.json:
+            print(json.dumps(report, indent=4))
+            return
+
+        outdated = [mod for mod in report['mods'] if mod['outdated']]
+
+        for mod in report['mods']:
+            if mod['error']:
+                print("Warning: %s" % mod['error'])
+
+        if not outdated:
+            print("All mods are up to date")
+            return
+
+        print("Outdated mods:")
+        for mod in outdated:
+            print("    %s %s -> %s%s" % (
+                mod['name'], mod['version'], mod['latest'],
+                " (held)" if mod['held'] else ""
+            ))
+
+    def check(self, mods, game_ver):
+        """Return the update report of the given installed mods"""
+
+        entries = []
+        fetch = set()
+
+        for mod in sorted(mods, key=lambda m: m.name):
+            entry = {
+                'name': mod.name,
+                'version': str(mod.version),
+                'enabled': mod.enabled,
+                'packed': mod.packed,
+                'held': mod.held,
+                'latest': None,
+                'outdated': False,
+                'error': None,
+            }
+            entries.append((mod, entry))
+
+            record = self.db.mods.get(mod.name)
+            if not record or not record.get('latest_release'):
+                entry['error'] = "%s is not in the mods database" % mod.name
+                continue
+
+            latest = JSONDict(record['latest_release'])
+            latest_ver = parse_version(latest.version)
+
+            if match_game_version(latest, game_ver):
+                entry['latest'] = str(latest_ver)
+            elif latest_ver > mod.version:
+                # An older release may be for our game version
+                fetch.add(mod.name)
+
+        releases = self.fetch_releases(fetch, game_ver)
+
+        for mod, entry in entries:
+            if mod.name in releases:
+                release = releases[mod.name]
+                if isinstance(release, Exception):
+                    entry['error'] = str(release)
+                elif release:
+                    entry['latest'] = str(release)
+
+            if entry['latest']:
+                entry['outdated'] = mod.version < entry['latest']
+
+        mods = [entry for mod, entry in entries]
+
+        return {
+            'game_version': str(game_ver) if game_ver else None,
+            'outdated': sum(1 for entry in mods if entry['outdated']),
+            'mods': mods,
+        }
+
+    def fetch_releases(self, names, game_ver):
+        """
+        Find the latest release of each mod for this game version.
+
+        Returns a dict of mod names to the version (or None if there is
+        no compatible release, or the exception that occurred).
+        """
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        def latest(name):
+            try:
+                mod = self.api.get_mod(name)
+            except Exception as ex:
+                return ex
+
+            versions = [parse_version(release.version)
+                        for release in mod.releases
+                        if match_game_version(release, game_ver)]
+            return max(versions) if versions else None
+
+        if not names:
+            return {}
+
+        names = sorted(names)
+        jobs = min(len(names), self.config.getint('downloads', 'jobs'))
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            return dict(zip(names, executor.map(latest, names)))
@@ -1,4 +1,5 @@
 from fac.commands import Command, Arg
+from fac.ziputils import COMPRESSION_TYPES
 
 
 class PackUnpackCommand(Command):
@@ -33,7 +34,9 @@ class PackUnpackCommand(Command):
                     continue
 
                 if pack:
-                    mod.pack(replace=args.replace, keep=args.keep)
+                    mod.pack(replace=args.replace, keep=args.keep,
+                             compression=args.compression,
+                             level=args.level)
                 else:
                     mod.unpack(replace=args.replace, keep=args.keep)
 
@@ -41,10 +44,23 @@ class PackUnpackCommand(Command):
 
 
 class PackCommand(PackUnpackCommand):
-    """Pack mods."""
+    """
+    Pack mods.
+
+    Files are compressed in parallel. The compression method and level
+    default to the `compression` and `level` settings of the [pack]
+    section of the config file.
+    """
 
     name = 'pack'
 
+    arguments = PackUnpackCommand.arguments + [
+        Arg('-c', '--compression', choices=sorted(COMPRESSION_TYPES),
+            help="compression method"),
+        Arg('-l', '--level', type=int, choices=range(10), metavar='0-9',
+            help="compression level for deflate (0: fastest, 9: smallest)"),
+    ]
+
 
 class UnpackCommand(PackUnpackCommand):
     """Unpack mods."""
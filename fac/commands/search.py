@@ -50,6 +50,12 @@ class SearchCommand(Command):
             action='store_false',
             default=None,
             dest='sync'),
+
+        Arg('--full-sync',
+            help="Force a full database sync instead of fetching changes",
+            action='store_const',
+            const='full',
+            dest='sync'),
     ]
 
     epilog = """
@@ -105,7 +111,7 @@ class SearchCommand(Command):
         if args.sync is None:
             self.db.maybe_update()
         elif args.sync:
-            self.db.update()
+            self.db.update(full=args.sync == 'full' or None)
 
         # null queries just list all mods in alphabetical order by default
         if not args.query and not sort:
@@ -1,5 +1,5 @@
 from fac.commands import Command, Arg
-from fac.utils import prompt, Version
+from fac.utils import prompt, parse_version
 
 
 class UpdateCommand(Command):
@@ -40,7 +40,7 @@ class UpdateCommand(Command):
             except StopIteration:
                 continue
 
-            release_ver = Version(release.version)
+            release_ver = parse_version(release.version)
             local_ver = local_mod.version
 
             if release_ver > local_ver:
@@ -61,10 +61,9 @@ class UpdateCommand(Command):
                     print("%s is held. "
                           "Use -H to update it anyway." %
                           local_mod.name)
-                    break
+                    continue
 
                 updates.append((local_mod, release))
-                break
 
         if not updates:
             print("No updates were found")
@@ -84,5 +83,7 @@ class UpdateCommand(Command):
             if not args.yes and prompt("Continue?", "Y/n") != "y":
                 return
 
-            for local_mod, release in updates:
-                self.manager.install_mod(local_mod.name, release)
+            self.manager.install_mods([
+                (local_mod.name, release)
+                for local_mod, release in updates
+            ])
@@ -1,7 +1,8 @@
 import os.path
+import sys
 import time
-
-from appdirs import user_cache_dir
+import json
+import hashlib
 
 from whoosh import qparser, analysis
 from whoosh.query import Query
@@ -11,9 +12,11 @@ from whoosh.fields import columns, Schema, FieldType, TEXT, NUMERIC, ID
 from whoosh.filedb.filestore import FileStorage
 from whoosh.index import EmptyIndexError
 
-from fac.files import JSONFile
+from fac.store import ModStore
 from fac.utils import JSONDict, ProgressWidget
 
+DELTA_PAGE_SIZE = 100
+
 normal_analyzer = analysis.StandardAnalyzer()
 intra_analyzer = (analysis.RegexAnalyzer() | analysis.IntraWordFilter() |
                   analysis.LowercaseFilter())
@@ -35,12 +38,23 @@ def intraword(text, **kwargs):
     yield from intra_analyzer(text, **kwargs)
 
 
+def mod_timestamp(mod):
+    """Return the last update time of a mod as an ISO 8601 string"""
+
+    if 'updated_at' in mod:
+        return mod.updated_at
+
+    if mod.get('latest_release'):
+        return mod.latest_release.released_at
+
+
 class DB:
     def __init__(self, config, api):
         self.config = config
         self.api = api
-        self.cache_dir = user_cache_dir('fac', appauthor=False)
-        self.storage = FileStorage(os.path.join(self.cache_dir, 'index'))
+        self.cache_dir = config.cache_dir
+        self.index_path = os.path.join(self.cache_dir, 'index')
+        self.storage = FileStorage(self.index_path)
 
         self.schema = Schema(
             name=TEXT(sortable=True, phrase=True, field_boost=3,
@@ -51,7 +65,7 @@ class DB:
             summary=TEXT(phrase=True),
             downloads=NUMERIC(sortable=True),
             sort_name=SortColumn(),
-            name_id=ID(stored=True),
+            name_id=ID(stored=True, unique=True),
         )
 
         try:
@@ -59,51 +73,236 @@ class DB:
         except EmptyIndexError:
             self.index = None
 
-        self.db = JSONFile(os.path.join(self.cache_dir, 'mods.json'))
+        # Along with the mods data, the store keeps a hash of the indexed
+        # fields of each mod, used to only update the documents that changed.
+        self.store = ModStore(os.path.join(self.cache_dir, 'mods.sqlite'))
 
     def maybe_update(self):
         if self.needs_update():
             self.update()
 
     def needs_update(self):
-        if not self.index or not self.db.get('mods'):
+        last_update = self.store.get_meta('last_update')
+
+        if not self.index or not last_update:
             return True
 
-        last_update = self.db.mtime
         period = int(self.config.get('db', 'update_period'))
         db_age = time.time() - last_update
 
         return db_age > period
 
-    def update(self):
-        with ProgressWidget("Downloading mod database...") as progress:
-            mods = self.api.get_mods(progress)
+    def needs_full_sync(self):
+        sync = self.store.get_meta('sync')
+        if not sync or not sync.get('watermark'):
+            return True
+
+        period = int(self.config.get('db', 'full_sync_period'))
+        return time.time() - sync['last_full_sync'] > period
+
+    def update(self, full=None):
+        """
+        Synchronize the mods database with the mod portal.
+
+        A delta sync only fetches the mods updated since the last sync.
+        A full sync downloads the whole catalogue again: this is done
+        when `full` is True or, if it is None, when the last full sync
+        is older than the full_sync_period setting.
+        """
+
+        if full is None:
+            full = self.needs_full_sync()
+
+        try:
+            if full:
+                self.full_sync()
+            else:
+                self.delta_sync()
+        except BaseException:
+            self.store.rollback()
+            raise
+
+    def full_sync(self):
+        """
+        Download the whole catalogue.
+
+        Mods are merged into the database and the search index as they
+        are received. Mods that disappeared from the catalogue are removed.
+        """
+
+        seen = set()
+        changed = updated = 0
+        watermark = None
+
+        writer = self._index_writer()
+
+        try:
+            with ProgressWidget("Downloading mod database...") as progress:
+                for mod in self.api.iter_mods(progress):
+                    seen.add(mod.name)
+                    updated += self.store.update(mod.name, mod.data)
+
+                    timestamp = mod_timestamp(mod)
+                    if timestamp and (not watermark or
+                                      timestamp > watermark):
+                        watermark = timestamp
+
+                    changed += self._index_mod(writer, mod)
+
+            for name in set(self.store) - seen:
+                del self.store[name]
+                writer.delete_by_term('name_id', name)
+                changed += 1
+                updated += 1
+        except BaseException:
+            writer.cancel()
+            raise
+
+        self.store.set_meta('sync', {
+            'watermark': watermark,
+            'last_full_sync': time.time(),
+        })
+
+        # Full syncs are rare enough to also merge all the index segments
+        self._commit(writer, changed, updated, optimize=True)
+
+        # Remove the files used by previous versions to store the mods
+        for name in ('mods.json', 'index-hashes.json'):
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+
+    def delta_sync(self):
+        """
+        Fetch the mods sorted by update time, most recent first, until
+        the last seen update time (the watermark) is reached.
+        """
+
+        sync = self.store.get_meta('sync')
+        watermark = sync['watermark']
+        newest = watermark
+        changed = updated = 0
+
+        rebuild = self._index_outdated()
+        writer = self._index_writer()
+
+        if rebuild:
+            # Only the changed mods are fetched: index the stored ones
+            changed += self._index_stored_mods(writer)
+
+        try:
+            with ProgressWidget("Downloading mod database changes..."):
+                for mod in self._updated_mods(watermark):
+                    timestamp = mod_timestamp(mod)
+                    if timestamp and timestamp > newest:
+                        newest = timestamp
+
+                    updated += self.store.update(mod.name, mod.data)
+                    changed += self._index_mod(writer, mod)
+        except BaseException:
+            writer.cancel()
+            raise
+
+        sync['watermark'] = newest
+        self.store.set_meta('sync', sync)
+        self._commit(writer, changed, updated)
+
+    def _updated_mods(self, watermark):
+        pages = self.api.iter_mod_pages(
+            sort='updated_at', sort_order='desc',
+            page_size=DELTA_PAGE_SIZE
+        )
+
+        for page in pages:
+            for mod in page:
+                timestamp = mod_timestamp(mod)
 
-        old_mods = self.db.get('mods', {})
+                if timestamp and timestamp < watermark:
+                    return
 
-        self.db.mods = {mod.name: mod.data
-                        for mod in mods}
+                yield mod
 
-        if old_mods != self.db['mods']:
-            print("Building search index...")
+    def _index_outdated(self):
+        # No index yet or created by an older version
+        return self.index is None or not self.index.schema['name_id'].unique
+
+    def _index_writer(self):
+        if self._index_outdated():
             self.index = self.storage.create().create_index(self.schema)
+            self.store.clear_hashes()
+            self.store.commit()
+
+        return self.index.writer()
+
+    def _index_stored_mods(self, writer):
+        changed = 0
+
+        try:
+            for name in list(self.store):
+                changed += self._index_mod(writer, JSONDict(self.store[name]))
+        except BaseException:
+            writer.cancel()
+            raise
 
-            with self.index.writer() as w:
-                for mod in mods:
-                    w.add_document(
-                        name_id=mod.name,
-                        name=mod.name,
-                        sort_name=mod.name.lower(),
-                        title=mod.title.lower(),
-                        owner=mod.owner.lower(),
-                        summary=mod.summary.lower(),
-                        downloads=mod.downloads_count
-                    )
-                self.db.save()
-            print("Updated mods database (%d mods)" % len(mods))
+        return changed
+
+    def _commit(self, writer, changed, updated, optimize=False):
+        """
+        Commit the index and the database.
+
+        Status messages go to stderr, like the progress bars, so that the
+        output of the commands can be parsed (outdated -j).
+
+        changed is the number of updated index documents and updated
+        the number of mods whose data changed.
+        """
+
+        if changed:
+            print("Updating search index...", file=sys.stderr)
+            writer.commit(optimize=optimize)
+        else:
+            writer.cancel()
+
+        if updated:
+            print("Updated mods database (%d changed)" % updated,
+                  file=sys.stderr)
+        elif changed:
+            print("Updated search index (%d changed)" % changed,
+                  file=sys.stderr)
         else:
-            print("Index is up to date")
-            self.db.utime()
+            print("Index is up to date", file=sys.stderr)
+
+        self.store.set_meta('last_update', time.time())
+        self.store.commit()
+
+    def _index_mod(self, writer, mod):
+        """
+        Add or update the document of a mod in the index.
+
+        Returns True if the document had to be updated.
+        """
+
+        document = dict(
+            name_id=mod.name,
+            name=mod.name,
+            sort_name=mod.name.lower(),
+            title=mod.title.lower(),
+            owner=mod.owner.lower(),
+            summary=mod.summary.lower(),
+            downloads=mod.downloads_count
+        )
+
+        digest = hashlib.sha1(
+            json.dumps(document, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+
+        if self.store.get_hash(mod.name) == digest:
+            return False
+
+        writer.update_document(**document)
+        self.store.set_hash(mod.name, digest)
+        return True
 
     def search(self, query, sortedby=None, limit=None):
         parser = qparser.MultifieldParser(
@@ -137,10 +336,10 @@ class DB:
                     limit=limit,
                     sortedby=sortedby):
 
-                d = JSONDict(self.db.mods[result['name_id']])
+                d = JSONDict(self.store[result['name_id']])
                 d.score = result.score
                 yield d
 
     @property
     def mods(self):
-        return self.db.mods
+        return self.store
@@ -0,0 +1,115 @@
+"""Concurrent download of mod releases"""
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from fac.errors import AuthError
+from fac.utils import MultiProgressWidget
+
+
+class DownloadScheduler:
+    """
+    Download mod releases using a bounded pool of worker threads.
+
+    The workers share the API session, and thus its connection pool.
+    A failure in one download does not abort the others: errors are
+    collected and returned to the caller.
+
+    Downloads are done by manager.fetch_release, or by `fetch` if given
+    (a function with the same arguments).
+    """
+
+    def __init__(self, manager, jobs=None, fetch=None):
+        self.manager = manager
+        self.fetch = fetch or manager.fetch_release
+
+        if jobs is None:
+            jobs = manager.config.getint('downloads', 'jobs')
+
+        self.jobs = max(1, jobs)
+        self.cancelled = threading.Event()
+
+    def run(self, downloads, on_done=None):
+        """
+        Download a list of (release, file_path) pairs.
+
+        If given, on_done(index, progress) is called from the calling
+        thread as soon as each download succeeds, while the remaining
+        downloads keep running. Any error it raises is recorded as the
+        error of that download.
+
+        Returns a list containing the error raised by each download
+        (or None if it succeeded), in the same order.
+        """
+
+        errors = [None] * len(downloads)
+        pending = list(range(len(downloads)))
+        reset_login = False
+
+        while pending:
+            # Login is interactive so it must happen here and not in
+            # the workers.
+            player_data = self.manager.require_login(reset=reset_login)
+            self._run_batch(downloads, pending, errors, player_data,
+                            on_done)
+
+            pending = [i for i in pending
+                       if isinstance(errors[i], AuthError)]
+
+            if pending:
+                print("Authentication error when downloading mods. "
+                      "Please login again.")
+                reset_login = True
+
+        return errors
+
+    def _run_batch(self, downloads, indices, errors, player_data,
+                   on_done=None):
+        if len(indices) == 1:
+            text = "Downloading: %s..." % downloads[indices[0]][0].file_name
+        else:
+            text = "Downloading %d mods..." % len(indices)
+
+        workers = min(self.jobs, len(indices))
+
+        with MultiProgressWidget(text, len(indices)) as progress, \
+                ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for i in indices:
+                release, file_path = downloads[i]
+                future = executor.submit(self._download, release, file_path,
+                                         player_data, progress)
+                futures[future] = i
+
+            try:
+                for future in as_completed(futures):
+                    i = futures[future]
+                    errors[i] = future.exception()
+
+                    if errors[i] is None and on_done:
+                        try:
+                            on_done(i, progress)
+                        except Exception as ex:
+                            errors[i] = ex
+            except KeyboardInterrupt:
+                self.cancelled.set()
+                raise
+
+    def _download(self, release, file_path, player_data, progress):
+        key = release.file_name
+
+        def report(cur, tot):
+            progress.update(key, cur, tot)
+
+        try:
+            self.fetch(release, file_path, player_data,
+                       progress=report, cancelled=self.cancelled)
+        except AuthError:
+            progress.item_done(key)
+            raise
+        except Exception as ex:
+            progress.item_done(key, "Error downloading %s: %s" % (key, ex))
+            raise
+        else:
+            progress.item_done(key)
@@ -13,3 +13,11 @@ class OwnershipError(AuthError):
 class ModNotFoundError(BaseError):
     def __init__(self, mod):
         super().__init__("Mod not found: %s" % mod)
+
+
+class ChecksumError(BaseError):
+    pass
+
+
+class ResolutionError(BaseError):
+    pass
@@ -1,13 +1,15 @@
 import os
 import sys
 import json
+import shutil
 import os.path
+import threading
 
 from configparser import ConfigParser
 
-from appdirs import user_config_dir, user_data_dir
+from appdirs import user_config_dir, user_data_dir, user_cache_dir
 
-from fac.utils import JSONDict, Version
+from fac.utils import JSONDict, parse_major_version, parse_size
 
 __all__ = ['Config', 'JSONFile']
 
@@ -72,6 +74,22 @@ class Config(ConfigParser):
 
     [db]
     update_period = 600
+    full_sync_period = 604800
+
+    [downloads]
+    jobs = 4
+
+    [cache]
+    api_ttl = 600
+    api_size = 50M
+    store = yes
+    store_size = 2G
+    partial_max_age = 86400
+    gc_interval = 3600
+
+    [pack]
+    compression = deflated
+    level = 6
     '''
 
     def __init__(self, config_file=None):
@@ -81,6 +99,7 @@ class Config(ConfigParser):
         self.hold = []
         self.forced_game_version = None
         self.forced_mods_directory = None
+        self._discovered = {}
 
         if config_file:
             self.config_file = config_file
@@ -126,10 +145,108 @@ class Config(ConfigParser):
             return False
         return True
 
+    def _memoize(self, key, func, *args):
+        """Only discover things once, unless the configuration changes"""
+
+        if key not in self._discovered:
+            self._discovered[key] = func(*args)
+        return self._discovered[key]
+
+    @property
+    def environment_cache(self):
+        """
+        Persistent cache of the paths found by probing the filesystem.
+
+        Entries are only valid as long as the mtime of base/info.json is
+        unchanged.
+        """
+
+        return self._memoize('environment_cache', self._load_environment)
+
+    def _load_environment(self):
+        file = os.path.join(self.cache_dir, 'environment.json')
+        try:
+            return JSONFile(file)
+        except ValueError:
+            # corrupted cache file
+            os.remove(file)
+            return JSONFile(file)
+
+    def _save_environment(self, **values):
+        cache = self.environment_cache
+
+        if any(key in values and values[key] != cache.get(key)
+               for key in ('data_path', 'info_mtime')):
+            # Everything else depends on these
+            cache.clear()
+
+        cache.update(values)
+        try:
+            os.makedirs(os.path.dirname(cache.file), exist_ok=True)
+            cache.save()
+        except OSError:
+            pass
+
+    def _cached_environment(self, name, data_path=None):
+        cache = self.environment_cache
+
+        if data_path is None:
+            data_path = cache.get('data_path')
+
+        if not data_path or data_path != cache.get('data_path') or \
+                name not in cache:
+            return None
+
+        try:
+            st = os.stat(os.path.join(data_path, 'base', 'info.json'))
+        except OSError:
+            return None
+
+        if st.st_mtime_ns != cache.get('info_mtime'):
+            return None
+
+        return cache[name]
+
+    def _probe(self, name, check):
+        """
+        Return the first search path accepted by check(), or None.
+
+        Relative search paths depend on the current directory so they are
+        always probed, but the result for the other ones is persisted.
+        """
+
+        cache_checked = False
+
+        for path in FACTORIO_SEARCH_PATHS:
+            path = os.path.expanduser(path)
+            path = os.path.expandvars(path)
+
+            if os.path.isabs(path) and not cache_checked:
+                cache_checked = True
+                cached = self._cached_environment(name)
+                if cached and check(cached) == cached:
+                    return cached
+
+            found = check(path)
+            if not found:
+                continue
+
+            if os.path.isabs(found):
+                values = {name: found}
+                if name == 'data_path':
+                    values['info_mtime'] = os.stat(
+                        os.path.join(found, 'base', 'info.json')
+                    ).st_mtime_ns
+                self._save_environment(**values)
+
+            return found
+
     @property
     def factorio_data_path(self):
         path = self.get('paths', 'data-path')
+        return self._memoize(('data-path', path), self._find_data_path, path)
 
+    def _find_data_path(self, path):
         if path and self.is_factorio_data_path(path):
             return path
         elif path:
@@ -140,15 +257,17 @@ class Config(ConfigParser):
                 % (path, self.config_file)
             )
         else:
-            for path in FACTORIO_SEARCH_PATHS:
-                path = os.path.expanduser(path)
-                path = os.path.expandvars(path)
+            def check(path):
                 if self.is_factorio_data_path(path):
                     return path
                 path = os.path.join(path, 'data')
                 if self.is_factorio_data_path(path):
                     return path
 
+            path = self._probe('data_path', check)
+            if path:
+                return path
+
         raise Exception(
             "Can not find the factorio data path.\n"
             "Please set the data-path variable in %s" % (
@@ -159,7 +278,9 @@ class Config(ConfigParser):
     @property
     def factorio_write_path(self):
         path = self.get('paths', 'write-path')
+        return self._memoize(('write-path', path), self._find_write_path, path)
 
+    def _find_write_path(self, path):
         if path and self.is_factorio_write_path(path):
             return path
         elif path:
@@ -173,12 +294,14 @@ class Config(ConfigParser):
                 )
             )
         else:
-            for path in FACTORIO_SEARCH_PATHS:
-                path = os.path.expanduser(path)
-                path = os.path.expandvars(path)
+            def check(path):
                 if self.is_factorio_write_path(path):
                     return path
 
+            path = self._probe('write_path', check)
+            if path:
+                return path
+
         raise Exception(
             "Can not find a valid factorio write path.\n"
             "Please set one using the write-path variable in %s" % (
@@ -186,6 +309,13 @@ class Config(ConfigParser):
             )
         )
 
+    @property
+    def cache_dir(self):
+        return user_cache_dir('fac', appauthor=False)
+
+    def get_size(self, section, option):
+        return parse_size(self.get(section, option))
+
     @property
     def player_data(self):
         return JSONFile(
@@ -199,11 +329,22 @@ class Config(ConfigParser):
         if self.forced_game_version:
             return self.forced_game_version
 
-        json_file = os.path.join(
-            self.factorio_data_path,
-            'base', 'info.json'
-        )
+        data_path = self.factorio_data_path
+        return self._memoize(('game-version', data_path),
+                             self._read_game_version, data_path)
+
+    def _read_game_version(self, data_path):
+        data_path = os.path.abspath(data_path)
+        cached = self._cached_environment('game_version', data_path)
+        if cached:
+            return cached
+
+        json_file = os.path.join(data_path, 'base', 'info.json')
+        mtime = os.stat(json_file).st_mtime_ns
         json = JSONFile(json_file)
+
+        self._save_environment(data_path=data_path, info_mtime=mtime,
+                               game_version=json.version)
         return json.version
 
     def set_game_version(self, version):
@@ -213,7 +354,7 @@ class Config(ConfigParser):
 
     @property
     def game_version_major(self):
-        return Version('.'.join(self.game_version.split('.')[:2]))
+        return parse_major_version(self.game_version)
 
     def get_mods_directory(self):
         if self.forced_mods_directory:
@@ -230,15 +371,16 @@ class JSONFile(JSONDict):
     file = None
 
     def __init__(self, file):
+        super().__init__()
         self.file = file
-        self.data = {}
         self.reload()
 
     def __enter__(self):
         return self
 
-    def __exit__(self):
-        self.save()
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        if exc_type is None:
+            self.save()
 
     def reload(self):
         if not os.path.exists(self.file):
@@ -248,8 +390,24 @@ class JSONFile(JSONDict):
             self.data = json.load(f)
 
     def save(self):
-        with open(self.file, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, indent=4)
+        # Write to a temporary file first so that the file is never left
+        # half-written
+        tmp_path = '%s.%d-%d.tmp' % (self.file, os.getpid(),
+                                     threading.get_ident())
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=4)
+
+            try:
+                shutil.copymode(self.file, tmp_path)
+            except FileNotFoundError:
+                pass
+
+            os.replace(tmp_path, self.file)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
 
     @property
     def mtime(self):
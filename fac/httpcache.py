@@ -0,0 +1,157 @@
+"""Persistent cache for API responses"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+
+
+class ResponseCache:
+    """
+    On-disk cache of HTTP responses, keyed by URL.
+
+    Each entry stores the response content along with its ETag and
+    Last-Modified headers so that stale entries can be revalidated using
+    a conditional request.
+
+    Entries younger than `ttl` seconds are used without revalidation.
+    The total size of the cache is kept under `size_limit` bytes by
+    evicting the least recently used entries.
+    """
+
+    def __init__(self, directory, ttl=600, size_limit=None):
+        self.directory = directory
+        self.ttl = ttl
+        self.size_limit = size_limit
+
+    def _path(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + '.json')
+
+    def get(self, url):
+        """Return the cache entry for this URL, or None"""
+
+        path = self._path(url)
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get('url') != url:
+            return None
+
+        # The mtime is used to track the last access for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry['time'] < self.ttl
+
+    def conditional_headers(self, entry):
+        headers = {}
+
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        return headers
+
+    def store(self, url, resp):
+        """Store a successful response, returning the new entry"""
+
+        entry = {
+            'url': url,
+            'etag': resp.headers.get('etag'),
+            'last_modified': resp.headers.get('last-modified'),
+            'time': time.time(),
+            'content': resp.text,
+        }
+
+        if self._write(url, entry):
+            self.evict()
+        return entry
+
+    def refresh(self, url, entry):
+        """Mark an entry as fresh after a successful revalidation"""
+
+        entry['time'] = time.time()
+        self._write(url, entry)
+        return entry
+
+    def _write(self, url, entry):
+        """
+        Write an entry, returning False if it could not be written.
+
+        The cache is best effort: when the cache directory is read-only
+        or full, the response is used without being cached.
+        """
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory,
+                                            suffix='.tmp')
+        except OSError:
+            return False
+
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(url))
+        except BaseException as ex:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+            if isinstance(ex, OSError):
+                return False
+            raise
+
+        return True
+
+    def entries(self):
+        """Return a list of (mtime, size, path) for all entries"""
+
+        try:
+            files = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return []
+
+        res = []
+        for f in files:
+            if not f.name.endswith('.json'):
+                continue
+            try:
+                st = f.stat()
+            except FileNotFoundError:
+                continue
+            res.append((st.st_mtime, st.st_size, f.path))
+        return res
+
+    def evict(self):
+        """Remove the least recently used entries to enforce the size cap"""
+
+        if not self.size_limit:
+            return
+
+        entries = self.entries()
+        total = sum(size for mtime, size, path in entries)
+
+        for mtime, size, path in sorted(entries):
+            if total <= self.size_limit:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,210 @@
+"""Installation of mod releases"""
+
+import os
+import shutil
+
+from contextlib import redirect_stdout
+
+from fac.download import DownloadScheduler
+from fac.mods import ZippedMod
+from fac.releasestore import describe_removal
+
+
+class _ProgressWriter:
+    """File-like object printing lines through a progress widget"""
+
+    def __init__(self, progress):
+        self.progress = progress
+        self.buffer = ''
+
+    def write(self, text):
+        self.buffer += text
+        *lines, self.buffer = self.buffer.split('\n')
+        for line in lines:
+            self.progress.message(line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class Installer:
+    """
+    Install a list of mod releases as a pipeline.
+
+    Releases are downloaded (and verified) by the download workers, and
+    each mod is installed from the main thread as soon as its download
+    is complete: while a mod is being moved in place, unpacked and
+    enabled, the next ones are still downloading.
+
+    Changes to mod-list.json are saved once, at the end.
+
+    Releases with a known SHA-1 are downloaded once into the release
+    store and hard linked from there into the mods directory. The store
+    is shared by all the instances of the host: downloads into it are
+    locked, so that a release is only downloaded by one of them.
+    """
+
+    def __init__(self, manager, jobs=None):
+        self.manager = manager
+        self.jobs = jobs
+
+    def run(self, releases, enable=None, unpack=None):
+        """
+        Install a list of (mod_name, release) pairs.
+
+        Releases already in the release store are installed from there
+        without being downloaded. Returns the pairs that could not be
+        installed.
+        """
+
+        manager = self.manager
+        store = manager.release_store
+        tmp_dir = os.path.join(manager.config.factorio_write_path, 'tmp')
+
+        # File to install for each release
+        sources = []
+        downloads = []
+        download_indices = []
+        stored = []
+
+        for i, (mod_name, release) in enumerate(releases):
+            manager.validate_mod_file_name(release.file_name)
+            sha1 = self._store_key(release)
+
+            if sha1:
+                path = store.get(sha1)
+                if path:
+                    sources.append(path)
+                    stored.append(i)
+                    continue
+
+                path = store.download_path(release)
+            else:
+                os.makedirs(tmp_dir, exist_ok=True)
+                path = os.path.join(tmp_dir, release.file_name)
+
+            sources.append(path)
+            downloads.append((release, path))
+            download_indices.append(i)
+
+        if any(self._store_key(release) for mod_name, release in releases):
+            store.register_mods_directory(manager.config.mods_directory)
+
+        def fetch(release, file_path, *args, **kwargs):
+            sha1 = self._store_key(release)
+
+            if not sha1:
+                manager.fetch_release(release, file_path, *args, **kwargs)
+                return
+
+            with store.lock(release):
+                # Another instance may have downloaded it meanwhile
+                if store.get(sha1) is None:
+                    manager.fetch_release(release, file_path,
+                                          *args, **kwargs)
+                    store.add(sha1, file_path)
+
+        def install(i):
+            mod_name, release = releases[i]
+            source = sources[i]
+            sha1 = self._store_key(release)
+
+            if sha1 and i not in stored:
+                source = store.path(sha1)
+
+            self.install_file(mod_name, source, release.file_name,
+                              enable, unpack, link=bool(sha1))
+
+        def on_done(j, progress):
+            i = download_indices[j]
+
+            try:
+                with redirect_stdout(_ProgressWriter(progress)):
+                    install(i)
+            except Exception as ex:
+                progress.message("Error installing %s: %s" % (
+                    releases[i][1].file_name, ex
+                ))
+                raise
+
+        errors = [None] * len(releases)
+        scheduler = DownloadScheduler(manager, self.jobs, fetch)
+
+        try:
+            with manager.transaction():
+                for i in stored:
+                    print("Installing from the release store: %s" % (
+                        releases[i][1].file_name
+                    ))
+
+                    try:
+                        install(i)
+                    except Exception as ex:
+                        print("Error installing %s: %s" % (
+                            releases[i][1].file_name, ex
+                        ))
+                        errors[i] = ex
+
+                download_errors = scheduler.run(downloads, on_done)
+        finally:
+            if store is not None:
+                store.flush()
+
+        for i, error in zip(download_indices, download_errors):
+            errors[i] = error
+
+        if store is not None:
+            self.collect_garbage(store)
+
+        return [pair for pair, error in zip(releases, errors) if error]
+
+    def collect_garbage(self, store):
+        """Run the GC of the release store, if it didn't run recently"""
+
+        result = store.maybe_gc()
+
+        if result and (result.releases or result.partials):
+            print(describe_removal(result))
+
+    def _store_key(self, release):
+        """Return the SHA-1 of a release, if it can use the release store"""
+
+        if self.manager.release_store is None:
+            return None
+        return release.get('sha1')
+
+    def install_file(self, mod_name, source, file_name=None, enable=None,
+                     unpack=None, link=False):
+        """
+        Install a mod file, replacing any installed version.
+
+        The file is moved to the mods directory, or hard linked (or
+        copied) from the release store if link is True.
+        """
+
+        manager = self.manager
+        file_path = os.path.join(manager.config.mods_directory,
+                                 file_name or os.path.basename(source))
+
+        installed_mod = manager.get_mod(mod_name)
+        if installed_mod and unpack is None:
+            unpack = not installed_mod.packed
+
+        if link:
+            manager.release_store.install(source, file_path)
+        else:
+            shutil.move(source, file_path)
+        manager.inventory.invalidate()
+
+        mod = ZippedMod(manager, file_path)
+
+        if installed_mod and (installed_mod.basename != mod.basename or
+                              not installed_mod.packed):
+            installed_mod.remove()
+
+        if enable is not None:
+            mod.enabled = enable
+
+        if unpack:
+            mod.unpack()
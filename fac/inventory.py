@@ -0,0 +1,164 @@
+"""Inventory of the installed mods"""
+
+import os
+import sys
+import hashlib
+
+from glob import glob
+
+from fac.files import JSONFile
+from fac.mods import ZippedMod, UnpackedMod, read_zip_info
+
+
+class Inventory:
+    """
+    List of the mods installed in the mods directory.
+
+    Reading the info.json of a zipped mod requires opening the zip file, so
+    the parsed info of each zip file is kept in a persistent cache, keyed
+    by the path, mtime, size and inode of the file. Only the files that
+    changed since the last scan are read again, concurrently.
+
+    The scan result is also kept in memory until invalidate() is called,
+    which must be done whenever mods are added or removed.
+
+    Invalid mods are reported on stderr, so that they don't end up in
+    the output of the commands (outdated -j).
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self._mods = None
+
+    @property
+    def mods_directory(self):
+        return self.manager.config.mods_directory
+
+    @property
+    def cache_file(self):
+        key = hashlib.sha1(
+            os.path.abspath(self.mods_directory).encode('utf-8')
+        ).hexdigest()
+
+        return os.path.join(self.manager.config.cache_dir, 'inventory',
+                            key + '.json')
+
+    @property
+    def mods(self):
+        """List of the installed mods (zipped mods first)"""
+
+        if self._mods is None:
+            self._mods = self._scan()
+        return self._mods
+
+    def invalidate(self):
+        self._mods = None
+
+    def _load_cache(self):
+        """Return the cache file, or None if it can not be read"""
+
+        try:
+            try:
+                return JSONFile(self.cache_file)
+            except ValueError:
+                # corrupted cache file
+                os.remove(self.cache_file)
+                return JSONFile(self.cache_file)
+        except OSError:
+            return None
+
+    def _scan(self):
+        cache = self._load_cache()
+        entries = cache.get('zips', {}) if cache is not None else {}
+        new_entries = {}
+        mods = []
+
+        paths = sorted(
+            os.path.abspath(path)
+            for path in glob(os.path.join(self.mods_directory, '*.zip'))
+        )
+
+        for path, entry in zip(paths, self._scan_zips(paths, entries)):
+            if isinstance(entry, Exception):
+                print("Warning: invalid mod %s: %s" % (path, entry),
+                      file=sys.stderr)
+                continue
+
+            new_entries[path] = entry
+            mods.append(ZippedMod(self.manager, path,
+                                  info=entry['info'],
+                                  toplevel=entry['toplevel']))
+
+        for path in sorted(glob(os.path.join(self.mods_directory,
+                                             '*', 'info.json'))):
+            try:
+                mod = UnpackedMod(self.manager, path)
+            except Exception as ex:
+                print("Warning: invalid mod %s: %s" % (path, ex),
+                      file=sys.stderr)
+                continue
+
+            mods.append(mod)
+
+        if cache is not None and new_entries != entries:
+            cache.zips = new_entries
+            try:
+                os.makedirs(os.path.dirname(cache.file), exist_ok=True)
+                cache.save()
+            except OSError:
+                # The cache is best effort (read-only cache directory...)
+                pass
+
+        return mods
+
+    def _scan_zips(self, paths, entries):
+        """
+        Return the cache entry of each zip file, in the same order.
+
+        Entries for new or modified files are read concurrently since
+        this is mostly waiting on I/O (especially on network filesystems).
+        In case of error, the exception is returned instead of the entry.
+        """
+
+        results = []
+        missing = []
+
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError as ex:
+                results.append(ex)
+                continue
+
+            key = [st.st_mtime_ns, st.st_size, st.st_ino]
+            entry = entries.get(path)
+
+            if entry and entry['key'] == key:
+                results.append(entry)
+            else:
+                missing.append((len(results), path, key))
+                results.append(None)
+
+        if len(missing) > 1:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor() as executor:
+                read = list(executor.map(self._read_zip, missing))
+        else:
+            read = [self._read_zip(item) for item in missing]
+
+        for (i, _, _), entry in zip(missing, read):
+            results[i] = entry
+
+        return results
+
+    @staticmethod
+    def _read_zip(item):
+        _, path, key = item
+
+        try:
+            toplevel, info = read_zip_info(path)
+        except Exception as ex:
+            return ex
+
+        return {'key': key, 'info': info, 'toplevel': toplevel}
@@ -1,15 +1,26 @@
+import sys
 import argparse
-import logging
+import importlib
 
-from fac.api import API
-from fac.db import DB
-from fac.files import Config
-from fac.mods import ModManager
-
-import fac.commands.all  # NOQA
+import fac
 from fac.commands import CommandRegistry
+from fac.commands.all import COMMANDS
+
+# Common options taking a value
+VALUE_OPTIONS = ('-g', '--game-version', '-m', '--mods-directory')
+
 
-log = logging.getLogger(__name__)
+def find_command_name(argv):
+    """Return the name of the command given on the command line, if any"""
+
+    args = iter(argv)
+    for arg in args:
+        if arg in VALUE_OPTIONS:
+            next(args, None)
+        elif arg == '--':
+            return next(args, None)
+        elif not arg.startswith('-'):
+            return arg
 
 
 def main():
@@ -45,13 +56,27 @@ def main():
         dest='command', metavar='COMMAND', title=None,
     )
 
-    api = API()
-    config = Config()
-    db = DB(config, api)
-    manager = ModManager(api=api, config=config, db=db)
+    # Only the module of the command being run is imported, the other
+    # commands just get a placeholder parser for the help message.
+    command_name = find_command_name(sys.argv[1:])
+    manager = None
+
+    def create_manager():
+        from fac.files import Config
+        from fac.mods import ModManager
 
-    for command_class in CommandRegistry.commands:
-        command = command_class(manager)
+        # The API client and the mods database are only created when the
+        # command actually uses them
+        return ModManager(config=Config())
+
+    for name, module, help in COMMANDS:
+        if name != command_name:
+            command_subparsers.add_parser(name, help=help, add_help=False)
+            continue
+
+        manager = create_manager()
+        importlib.import_module(module)
+        command = CommandRegistry.find(name)(manager)
         command.create_parser(command_subparsers, [common_parser])
 
     root_parser = argparse.ArgumentParser(
@@ -66,8 +91,15 @@ def main():
     # Allow common options both before and after command
     common_parser.parse_known_args(namespace=args)
 
-    if args.verbose:
-        logging.basicConfig(level=logging.DEBUG)
+    if not args.command and not args.verbose:
+        root_parser.print_help()
+        return
+
+    if manager is None:
+        # fac -v: show the detected locations before the help
+        manager = create_manager()
+
+    config = manager.config
 
     if args.game_version:
         config.game_version = args.game_version
@@ -77,19 +109,25 @@ def main():
 
     manager.load()
 
-    log.debug("fac version: %s" % fac.__version__)
-    log.debug("Factorio write path: %s", config.factorio_write_path)
-    log.debug("Factorio game path: %s", config.factorio_data_path)
-    log.debug("Mods directory: %s", config.mods_directory)
-    log.debug("Factorio version: %s", config.game_version)
-
-    if args.command:
-        try:
-            args.run(args)
-        except KeyboardInterrupt:
-            pass
-    else:
+    if args.verbose:
+        import logging
+        logging.basicConfig(level=logging.DEBUG)
+        log = logging.getLogger(__name__)
+
+        log.debug("fac version: %s" % fac.__version__)
+        log.debug("Factorio write path: %s", config.factorio_write_path)
+        log.debug("Factorio game path: %s", config.factorio_data_path)
+        log.debug("Mods directory: %s", config.mods_directory)
+        log.debug("Factorio version: %s", config.game_version)
+
+    if not args.command:
         root_parser.print_help()
+        return
+
+    try:
+        args.run(args)
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == '__main__':
@@ -1,18 +1,29 @@
 import os.path
+import re
 import shutil
 import json
+import threading
 
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from urllib.parse import urljoin
 from fnmatch import fnmatchcase
-from zipfile import ZipFile
-from pathlib import Path
-from glob import glob
+from zipfile import ZipFile, BadZipFile
 
 from fac.files import JSONFile
-from fac.utils import (JSONDict, ProgressWidget,
-                       Version, parse_game_version, match_game_version)
+from fac.utils import (JSONDict, parse_version, sort_releases,
+                       parse_game_version, match_game_version)
+from fac.ziputils import (compression_type, file_crc, preallocate,
+                          replace_members, write_files, BUFFER_SIZE)
 
-from fac.errors import ModNotFoundError, AuthError, OwnershipError
+from fac.errors import (ModNotFoundError, AuthError, OwnershipError,
+                        ChecksumError)
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+CONTENT_RANGE_RE = re.compile(
+    r'^bytes (?P<start>\d+)-(?P<end>\d+)/(?P<length>\d+|\*)$'
+)
 
 
 class Mod:
@@ -44,37 +55,45 @@ class Mod:
 
     @property
     def version(self):
-        return Version(self.info.version)
+        return parse_version(self.info.version)
 
     @property
     def game_version(self):
         return parse_game_version(self.info)
 
-    @classmethod
-    def _find(cls, pattern, manager, name, version):
-        name = '*' if name is None else name
+    def match(self, name=None, version=None):
+        """Check the mod against a name pattern and exact version"""
 
-        installed = glob(
-            os.path.join(
-                manager.config.mods_directory,
-                pattern
-            )
-        )
-        for path in installed:
-            try:
-                mod = cls(manager, path)
+        if name is not None and not fnmatchcase(self.name, name):
+            return False
 
-            except Exception as ex:
-                print("Warning: invalid mod %s: %s" % (path, ex))
-                continue
+        if version is not None and version != self.version:
+            return False
 
-            if not fnmatchcase(mod.name, name):
-                continue
+        return True
 
-            if version is not None and version != mod.version:
-                continue
 
-            yield mod
+def read_zip_info(path):
+    """
+    Return the top-level directory and info.json content of a zipped mod.
+
+    Only the zip central directory and the info.json entry are read.
+    """
+
+    with ZipFile(path) as f:
+        first_entry = f.namelist()[0]
+        toplevel = first_entry.split('/')[0]
+
+        if not toplevel:
+            raise Exception("Could not find a top-level directory")
+
+        info = json.loads(
+            f.read(
+                '%s/info.json' % toplevel,
+            ).decode('utf-8'),
+        )
+
+    return toplevel, info
 
 
 class ZippedMod(Mod):
@@ -89,8 +108,8 @@ class ZippedMod(Mod):
 
     packed = True
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    def __init__(self, manager, location, info=None, toplevel=None):
+        super().__init__(manager, location)
         self.basename = os.path.splitext(
                 os.path.basename(
                     self.location
@@ -99,30 +118,43 @@ class ZippedMod(Mod):
         self.parent = os.path.abspath(
             os.path.dirname(self.location)
         )
-        self._read_info()
+
+        if info is None:
+            self._read_info()
+        else:
+            # already known from the inventory cache
+            self.info = JSONDict(info)
+            self.toplevel = toplevel
 
     def remove(self):
         print("Removing file: %s" % self.location)
         os.remove(self.location)
+        self.manager.inventory.invalidate()
 
     def _read_info(self):
-        with ZipFile(self.location) as f:
-            first_entry = f.namelist()[0]
-            self.toplevel = first_entry.split('/')[0]
+        self.toplevel, info = read_zip_info(self.location)
+        self.info = JSONDict(info)
 
-            if not self.toplevel:
-                raise Exception("Could not find a top-level directory")
+    def pack(self, *args, **kwargs):
+        return self
 
-            info = json.loads(
-                f.read(
-                    '%s/info.json' % self.toplevel,
-                ).decode('utf-8'),
-            )
+    def update_info(self, **fields):
+        """
+        Change fields of info.json inside the zip file.
 
-            self.info = JSONDict(info)
+        The other files are copied as is to the new archive.
+        """
 
-    def pack(self, *args, **kwargs):
-        return self
+        info = dict(self.info.data)
+        info.update(fields)
+
+        replace_members(self.location, {
+            '%s/info.json' % self.toplevel:
+                json.dumps(info, indent=4).encode('utf-8'),
+        })
+
+        self.info = JSONDict(info)
+        self.manager.inventory.invalidate()
 
     def unpack(self, replace=False, keep=False):
         unpacked_location = os.path.join(self.parent, self.basename)
@@ -136,33 +168,144 @@ class ZippedMod(Mod):
 
         print("Unpacking: %s" % self.location)
 
-        with ZipFile(self.location) as f:
-            if replace and os.path.isdir(unpacked_location):
-                shutil.rmtree(unpacked_location)
+        # An existing directory is updated in place: only the files that
+        # differ from the archive are written.
+        created = not os.path.isdir(unpacked_location)
 
-            os.makedirs(unpacked_location)
+        with ZipFile(self.location) as f:
+            if created:
+                os.makedirs(unpacked_location)
 
             try:
-                for arcname in f.namelist():
-                    if not arcname.startswith(self.toplevel + '/'):
-                        print("Warning: out-of-place file %s ignored" % (
-                            arcname))
-                        continue
-
-                    dest = arcname[len(self.toplevel) + 1:]
-                    dest = self._sanitize_arcname(dest)
-                    dest = os.path.join(unpacked_location, dest)
-                    self._extract_member(f, arcname, dest)
+                members = self._list_members(f)
+                self._remove_extra_files(unpacked_location, members)
+                self._make_dirs(unpacked_location, members)
+
+                files = [(os.path.join(unpacked_location, dest), zinfo)
+                         for dest, zinfo in members
+                         if zinfo.filename[-1] != '/']
+                self._extract_files(f, files)
+
                 unpacked_mod = UnpackedMod(self.manager, unpacked_location)
             except Exception:
-                shutil.rmtree(unpacked_location)
+                if created:
+                    shutil.rmtree(unpacked_location)
                 raise
 
         if not keep:
             self.remove()
 
+        self.manager.inventory.invalidate()
         return unpacked_mod
 
+    def _list_members(self, zipfile):
+        """Return the (relative destination, ZipInfo) of the mod files"""
+
+        members = []
+
+        for zinfo in zipfile.infolist():
+            arcname = zinfo.filename
+            if not arcname.startswith(self.toplevel + '/'):
+                print("Warning: out-of-place file %s ignored" % (
+                    arcname))
+                continue
+
+            dest = arcname[len(self.toplevel) + 1:]
+            dest = self._sanitize_arcname(dest)
+            if dest:
+                members.append((dest, zinfo))
+
+        return members
+
+    def _remove_extra_files(self, location, members):
+        """Remove the files of an unpacked mod that are not in members"""
+
+        files = set()
+        dirs = set()
+
+        for dest, zinfo in members:
+            if zinfo.filename[-1] == '/':
+                dirs.add(dest)
+            else:
+                files.add(dest)
+
+            dest = os.path.dirname(dest)
+            while dest:
+                dirs.add(dest)
+                dest = os.path.dirname(dest)
+
+        for root, dir_names, file_names in os.walk(location, topdown=False):
+            rel_root = os.path.relpath(root, location)
+            if rel_root == os.path.curdir:
+                rel_root = ''
+
+            for name in file_names:
+                if os.path.join(rel_root, name) not in files:
+                    os.remove(os.path.join(root, name))
+
+            for name in dir_names:
+                path = os.path.join(root, name)
+                if os.path.islink(path):
+                    os.remove(path)
+                elif os.path.join(rel_root, name) not in dirs:
+                    os.rmdir(path)
+
+    def _make_dirs(self, location, members):
+        """Create all the directories of the mod beforehand"""
+
+        dirs = set()
+        for dest, zinfo in members:
+            if zinfo.filename[-1] != '/':
+                dest = os.path.dirname(dest)
+            if dest:
+                dirs.add(dest)
+
+        for dest in sorted(dirs):
+            dest = os.path.join(location, dest)
+            if not os.path.isdir(dest):
+                os.makedirs(dest)
+
+    def _extract_files(self, zipfile, files, jobs=None):
+        """
+        Extract the changed files among a list of (dest, ZipInfo).
+
+        Files are extracted in parallel, each thread having its own
+        handle on the archive.
+        """
+
+        jobs = min(len(files), jobs or os.cpu_count() or 1)
+
+        def extract(dest, zinfo, zipfile):
+            if not self._is_unchanged(dest, zinfo):
+                self._extract_member(zipfile, zinfo, dest)
+
+        if jobs <= 1:
+            for dest, zinfo in files:
+                extract(dest, zinfo, zipfile)
+            return
+
+        local = threading.local()
+        handles = []
+
+        def worker(item):
+            if not hasattr(local, 'zipfile'):
+                local.zipfile = ZipFile(self.location)
+                handles.append(local.zipfile)
+            extract(item[0], item[1], local.zipfile)
+
+        try:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                for result in executor.map(worker, files):
+                    pass
+        finally:
+            for handle in handles:
+                handle.close()
+
+    def _is_unchanged(self, dest, zinfo):
+        return (os.path.isfile(dest) and not os.path.islink(dest) and
+                os.path.getsize(dest) == zinfo.file_size and
+                file_crc(dest) == zinfo.CRC)
+
     def _sanitize_arcname(self, arcname):
         arcname = arcname.replace('/', os.path.sep)
 
@@ -180,24 +323,15 @@ class ZippedMod(Mod):
 
         return arcname
 
-    def _extract_member(self, zipfile, arcname, dest):
-        # Create all upper directories if necessary.
-        upperdirs = os.path.dirname(dest)
-        if upperdirs and not os.path.exists(upperdirs):
-            os.makedirs(upperdirs)
+    def _extract_member(self, zipfile, zinfo, dest):
+        # Don't write through a symbolic link
+        if os.path.islink(dest):
+            os.remove(dest)
 
-        if arcname[-1] == '/':
-            if not os.path.isdir(dest):
-                os.mkdir(dest)
-            return
-
-        with zipfile.open(arcname) as source, \
+        with zipfile.open(zinfo) as source, \
                 open(dest, 'wb') as target:
-            shutil.copyfileobj(source, target)
-
-    @classmethod
-    def find(cls, *args, **kwargs):
-        return cls._find('*.zip', *args, **kwargs)
+            preallocate(target.fileno(), zinfo.file_size)
+            shutil.copyfileobj(source, target, BUFFER_SIZE)
 
 
 class UnpackedMod(Mod):
@@ -221,6 +355,7 @@ class UnpackedMod(Mod):
     def remove(self):
         print("Removing directory: %s" % self.location)
         shutil.rmtree(self.location)
+        self.manager.inventory.invalidate()
 
     def _read_info(self):
         path = os.path.join(self.location, 'info.json')
@@ -229,7 +364,7 @@ class UnpackedMod(Mod):
     def unpack(self, *args, **kwargs):
         return self
 
-    def pack(self, replace=False, keep=False):
+    def pack(self, replace=False, keep=False, compression=None, level=None):
         packed_location = os.path.join(
             self.parent,
             self.basename + '.zip'
@@ -238,44 +373,124 @@ class UnpackedMod(Mod):
         if not replace and os.path.exists(packed_location):
             return ZippedMod(self.manager, packed_location)
 
+        config = self.manager.config
+        if compression is None:
+            compression = config.get('pack', 'compression')
+        if level is None:
+            level = config.getint('pack', 'level')
+
+        compress_type = compression_type(compression)
+
         print("Packing: %s" % self.location)
 
-        with ZipFile(packed_location, 'w') as f:
-            try:
-                for root, dirs, files in os.walk(self.location):
-                    zip_root = Path(root).relative_to(
-                        self.parent).as_posix()
-
-                    for file_name in files:
-                        f.write(
-                            '%s/%s' % (root, file_name),
-                            '%s/%s' % (zip_root, file_name),
-                        )
-                f.close()
-                packed_mod = ZippedMod(self.manager, packed_location)
-            except Exception:
-                f.close()
-                os.remove(packed_location)
-                raise
+        # Data of the unchanged files is copied from the existing archive
+        try:
+            source = ZipFile(packed_location)
+        except (OSError, BadZipFile):
+            source = None
+
+        tmp_location = '%s.%d.tmp' % (packed_location, os.getpid())
+
+        try:
+            with ZipFile(tmp_location, 'w') as f:
+                write_files(f, self._walk_files(), compress_type, level,
+                            source=source)
+        except Exception:
+            if os.path.exists(tmp_location):
+                os.remove(tmp_location)
+            raise
+        finally:
+            if source:
+                source.close()
+
+        os.replace(tmp_location, packed_location)
+        packed_mod = ZippedMod(self.manager, packed_location)
 
         if not keep:
             self.remove()
 
+        self.manager.inventory.invalidate()
         return packed_mod
 
-    @classmethod
-    def find(cls, *args, **kwargs):
-        return cls._find("*/info.json", *args, **kwargs)
+    def _walk_files(self):
+        """Yield the (path, arcname) of the files of this mod"""
+
+        for root, dirs, files in os.walk(self.location):
+            dirs.sort()
+            zip_root = os.path.relpath(root, self.parent).replace(
+                os.path.sep, '/')
+
+            for file_name in sorted(files):
+                yield (
+                    os.path.join(root, file_name),
+                    '%s/%s' % (zip_root, file_name),
+                )
 
 
 class ModManager:
     """Provides access to the factorio mods directory"""
 
-    def __init__(self, config, api, db):
-        self.api = api
+    def __init__(self, config, api=None, db=None):
         self.config = config
-        self.db = db
+        self._api = api
+        self._db = db
+        self._inventory = None
+        self._release_store = None
         self.mods_json = None
+        self._mods_json_index = {}
+        self._transactions = 0
+        self._mods_json_changed = False
+
+    @property
+    def api(self):
+        """Mod portal API client, created on first use"""
+
+        if self._api is None:
+            from fac.api import API, DEFAULT_POOL_SIZE
+            from fac.httpcache import ResponseCache
+
+            cache = ResponseCache(
+                os.path.join(self.config.cache_dir, 'api'),
+                ttl=self.config.getint('cache', 'api_ttl'),
+                size_limit=self.config.get_size('cache', 'api_size'),
+            )
+            # One connection per download worker
+            pool_size = max(self.config.getint('downloads', 'jobs'),
+                            DEFAULT_POOL_SIZE)
+            self._api = API(pool_size=pool_size, cache=cache)
+
+        return self._api
+
+    @property
+    def inventory(self):
+        """Installed mods, scanned on first use"""
+
+        if self._inventory is None:
+            from fac.inventory import Inventory
+            self._inventory = Inventory(self)
+
+        return self._inventory
+
+    @property
+    def release_store(self):
+        """Shared store of downloaded releases (None if disabled)"""
+
+        if (self._release_store is None and
+                self.config.getboolean('cache', 'store')):
+            from fac.releasestore import ReleaseStore
+            self._release_store = ReleaseStore.from_config(self.config)
+
+        return self._release_store
+
+    @property
+    def db(self):
+        """Mods database and search index, opened on first use"""
+
+        if self._db is None:
+            from fac.db import DB
+            self._db = DB(self.config, self.api)
+
+        return self._db
 
     def load(self):
         self.mods_json = JSONFile(
@@ -287,12 +502,43 @@ class ModManager:
         if 'mods' not in self.mods_json:
             self.mods_json.mods = []
 
+        self._mods_json_index = {
+            mod['name']: mod for mod in self.mods_json.data['mods']
+        }
+
     def get_mod_json(self, name):
         """Return the mod json configuration from mods-list.json"""
 
-        for mod in self.mods_json.mods:
-            if mod.name == name:
-                return mod
+        mod = self._mods_json_index.get(name)
+        if mod is not None:
+            return JSONDict(mod)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group changes to mod-list.json.
+
+        The file is only saved once, when leaving the outermost
+        transaction (even if an exception occurred, since the changes
+        may reflect mods that were actually installed).
+        """
+
+        self._transactions += 1
+        try:
+            yield self
+        finally:
+            self._transactions -= 1
+            if not self._transactions and self._mods_json_changed:
+                self.save_mods_json()
+
+    def save_mods_json(self):
+        """Save mod-list.json, or defer it until the end of a transaction"""
+
+        if self._transactions:
+            self._mods_json_changed = True
+        else:
+            self._mods_json_changed = False
+            self.mods_json.save()
 
     def get_mod(self, name, *args, **kwargs):
         for mod in self.find_mods(name, *args, **kwargs):
@@ -300,12 +546,9 @@ class ModManager:
                 return mod
 
     def find_mods(self, name=None, version=None, packed=None):
-        mods = []
-        for mod_type in (ZippedMod, UnpackedMod):
-            if packed is not None and mod_type.packed != bool(packed):
-                continue
-            mods.extend(mod_type.find(self, name, version))
-        return mods
+        return [mod for mod in self.inventory.mods
+                if (packed is None or mod.packed == bool(packed)) and
+                mod.match(name, version)]
 
     def resolve_mod_name(self, name, remote=False, patterns=True):
         if patterns and '*' in name:
@@ -361,7 +604,7 @@ class ModManager:
         yield from (
             release
             for release in releases
-            if release.version in spec
+            if parse_version(release.version) in spec
         )
 
     def resolve_local_requirement(self, req, ignore_game_ver=False):
@@ -376,10 +619,11 @@ class ModManager:
 
     def get_releases(self, mod_name, game_version):
         try:
-            mod = getattr(self.db.mods, mod_name)
-        except AttributeError:
+            mod = JSONDict(self.db.mods[mod_name])
+        except KeyError:
             raise ModNotFoundError(mod_name)
 
+        latest = None
         if match_game_version(mod.latest_release, game_version):
             latest = mod.latest_release
             yield latest
@@ -388,13 +632,14 @@ class ModManager:
         res = [release
                for release in mod.releases
                if match_game_version(release, game_version)
-               and release.version != latest.version]
+               and not (latest and release.version == latest.version)]
 
-        res.sort(key=lambda r: Version(r.version), reverse=True)
-        yield from res
+        yield from sort_releases(res)
 
     def is_mod_enabled(self, name):
-        mod = self.get_mod_json(name)
+        return self._is_enabled(self.get_mod_json(name))
+
+    def _is_enabled(self, mod):
         if mod:
             # Factorio < 0.15 uses "true"/"false" strings instead of booleans
             return mod.enabled != 'false' and mod.enabled is not False
@@ -405,18 +650,19 @@ class ModManager:
         mod = self.get_mod_json(name)
 
         if not mod:
-            mod = {'enabled': '', 'name': name}
-            self.mods_json.mods.append(mod)
-            mod = self.get_mod_json(name)
+            data = {'enabled': '', 'name': name}
+            self.mods_json.mods.append(data)
+            self._mods_json_index[name] = data
+            mod = JSONDict(data)
 
-        if enabled != self.is_mod_enabled(name):
-            if self.config.game_version < Version('0.15'):
+        if enabled != self._is_enabled(mod):
+            if self.config.game_version_major < parse_version('0.15'):
                 # Factorio < 0.15 uses "true"/"false" strings
                 # instead of booleans
                 mod.enabled = 'true' if enabled else 'false'
             else:
                 mod.enabled = enabled
-            self.mods_json.save()
+            self.save_mods_json()
             return True
         else:
             return False
@@ -490,35 +736,20 @@ class ModManager:
         return player_data
 
     def install_mod(self, mod_name, release, enable=None, unpack=None):
-        file_name = release.file_name
-        self.validate_mod_file_name(file_name)
-        file_path = os.path.join(self.config.mods_directory, file_name)
-
-        installed_mod = self.get_mod(mod_name)
-        if installed_mod and unpack is None:
-            unpack = not installed_mod.packed
-
-        tmp_file = os.path.join(
-            self.config.factorio_write_path,
-            'tmp',
-            file_name
-        )
-
-        os.makedirs(os.path.dirname(tmp_file), exist_ok=True)
-        self.download_mod(release, tmp_file)
-        shutil.move(tmp_file, file_path)
+        return not self.install_mods([(mod_name, release)],
+                                     enable=enable, unpack=unpack)
 
-        mod = ZippedMod(self, file_path)
+    def install_mods(self, releases, enable=None, unpack=None):
+        """
+        Install a list of (mod_name, release) pairs.
 
-        if installed_mod and (installed_mod.basename != mod.basename or
-                              not installed_mod.packed):
-            installed_mod.remove()
+        Each mod is installed as soon as it is downloaded, while the
+        next ones are still downloading. Returns the pairs that could not
+        be installed.
+        """
 
-        if enable is not None:
-            mod.enabled = enable
-
-        if unpack:
-            mod.unpack()
+        from fac.installer import Installer
+        return Installer(self).run(releases, enable, unpack)
 
     def validate_mod_file_name(self, file_name):
         assert '/' not in file_name
@@ -526,35 +757,176 @@ class ModManager:
         assert file_name.endswith('.zip')
 
     def download_mod(self, release, file_path):
-        player_data = self.require_login()
-        url = urljoin(self.api.base_url, release.download_url)
-        basename = release.file_name
+        error, = self.download_mods([(release, file_path)])
+        if error:
+            raise error
 
-        with ProgressWidget("Downloading: %s..." % basename) as progress:
-            while True:
-                req = self.api.get(
-                    url,
-                    params={
-                        'username': player_data['service-username'],
-                        'token': player_data['service-token']
-                    },
-                    stream=True,
+        return ZippedMod(self, file_path)
+
+    def download_mods(self, downloads, jobs=None):
+        """
+        Download a list of (release, file_path) pairs concurrently.
+
+        Returns the error raised by each download (or None).
+        """
+
+        from fac.download import DownloadScheduler
+        return DownloadScheduler(self, jobs).run(downloads)
+
+    def fetch_release(self, release, file_path, player_data,
+                      progress=None, cancelled=None):
+        """
+        Download a release file using the given credentials.
+
+        The data is written to `file_path`.part along with a .part.json
+        sidecar recording the expected length and validators of the
+        transfer. If a previous attempt was interrupted, only the missing
+        part is requested (using a Range request).
+
+        Raises AuthError if the credentials are refused.
+        This is called from the download worker threads.
+        """
+
+        part_file = file_path + '.part'
+        state = JSONFile(part_file + '.json')
+        offset, validator = self._resume_offset(release, part_file, state)
+
+        if not offset or offset != state.get('length'):
+            self._fetch_part(release, part_file, state, player_data,
+                             offset, validator, progress, cancelled)
+
+        try:
+            length = os.path.getsize(part_file)
+            if length != state.length:
+                raise ChecksumError(
+                    "Incomplete download for %s (%d of %d bytes)" % (
+                        release.file_name, length, state.length
+                    )
                 )
 
-                if req.status_code == 403:
-                    progress.error()
-                    print("Authentication error when downloading mod. "
-                          "Please login again.")
-                    player_data = self.require_login(reset=True)
-                    continue
-                break
+            self._verify_release(release, part_file)
+        except ChecksumError:
+            os.remove(part_file)
+            os.remove(state.file)
+            raise
+
+        os.replace(part_file, file_path)
+        os.remove(state.file)
+
+    def _resume_offset(self, release, part_file, state):
+        """
+        Return the (offset, validator) to resume a partial download from.
+
+        The offset is 0 if there is no usable partial download.
+        """
+
+        if (state.get('download_url') != release.download_url or
+                not os.path.isfile(part_file)):
+            return 0, None
+
+        # Weak ETags can not be used with If-Range
+        validator = state.get('etag')
+        if not validator or validator.startswith('W/'):
+            validator = state.get('last_modified')
+
+        if not validator:
+            return 0, None
+
+        return os.path.getsize(part_file), validator
+
+    def _fetch_part(self, release, part_file, state, player_data,
+                    offset, validator, progress, cancelled):
+        url = urljoin(self.api.base_url, release.download_url)
+        headers = {}
+
+        if offset:
+            headers['Range'] = 'bytes=%d-' % offset
+            headers['If-Range'] = validator
+
+        req = self.api.get(
+            url,
+            params={
+                'username': player_data['service-username'],
+                'token': player_data['service-token']
+            },
+            headers=headers,
+            stream=True,
+        )
+
+        try:
+            if req.status_code == 403:
+                raise AuthError("Access denied to %s" % release.file_name)
+
+            if req.status_code == 416:
+                # Our partial file doesn't match the remote one anymore:
+                # start again from scratch.
+                req.close()
+                return self._fetch_part(release, part_file, state,
+                                        player_data, 0, None,
+                                        progress, cancelled)
 
             req.raise_for_status()
-            length = int(req.headers['content-length'])
 
-            with open(file_path, 'wb') as f:
-                for chunk in req.iter_content(chunk_size=1024):
+            if offset and req.status_code == 206:
+                mode = 'ab'
+                length = self._parse_content_range(req, offset)
+
+                if length is None:
+                    req.close()
+                    return self._fetch_part(release, part_file, state,
+                                            player_data, 0, None,
+                                            progress, cancelled)
+            else:
+                # The server ignored the range (or there was none)
+                mode = 'wb'
+                length = int(req.headers['content-length'])
+
+                state.download_url = release.download_url
+                state.length = length
+                state.etag = req.headers.get('etag')
+                state.last_modified = req.headers.get('last-modified')
+                state.save()
+
+            with open(part_file, mode) as f:
+                for chunk in req.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if cancelled is not None and cancelled.is_set():
+                        raise KeyboardInterrupt
+
                     f.write(chunk)
-                    progress(f.tell(), length)
+                    if progress:
+                        progress(f.tell(), length)
+        finally:
+            req.close()
 
-        return ZippedMod(self, file_path)
+    def _parse_content_range(self, req, offset):
+        """
+        Return the total length announced by a 206 response.
+
+        Returns None if the response does not start at `offset`.
+        """
+
+        content_range = req.headers.get('content-range', '')
+        match = CONTENT_RANGE_RE.match(content_range)
+
+        if not match or int(match.group('start')) != offset:
+            return None
+
+        if match.group('length') == '*':
+            return offset + int(req.headers['content-length'])
+
+        return int(match.group('length'))
+
+    def _verify_release(self, release, file_path):
+        if 'sha1' not in release:
+            return
+
+        import hashlib
+        sha1 = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+                sha1.update(chunk)
+
+        if sha1.hexdigest() != release.sha1:
+            raise ChecksumError(
+                "Checksum mismatch for %s" % release.file_name
+            )
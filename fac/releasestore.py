@@ -0,0 +1,420 @@
+"""Content-addressed store of downloaded mod releases"""
+
+import os
+import time
+import shutil
+
+from collections import namedtuple
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: downloads are not locked
+    fcntl = None
+
+from fac.files import JSONFile
+from fac.utils import format_size
+
+# Files left in the download directories by interrupted downloads
+PARTIAL_SUFFIXES = ('.part', '.part.json')
+
+StoreEntry = namedtuple('StoreEntry',
+                        'sha1 path size inode file_name last_access')
+
+GCResult = namedtuple('GCResult', 'releases partials freed')
+
+
+def describe_removal(result):
+    return "Removed %d cached releases and %d partial downloads (%s freed)" % (
+        result.releases, result.partials, format_size(result.freed)
+    )
+
+
+class ReleaseStore:
+    """
+    Shared store of release files, keyed by their SHA-1.
+
+    Release files are downloaded once into the store, then installed in
+    each mods directory as hard links (or copies, when the mods directory
+    is on another file system). Files are never modified in place by
+    fac (repacking and patching write a new file), so hard links are safe.
+
+    The mods directories that files were installed into are recorded,
+    so that the files they still use can be found and kept by the
+    garbage collection. Other files are evicted, least recently
+    installed first, to keep the store under `size_limit` bytes.
+    Partial downloads older than `partial_max_age` seconds are removed
+    from the store's tmp directory and from `tmp_dirs`.
+    """
+
+    def __init__(self, directory, size_limit=None, partial_max_age=None,
+                 gc_interval=0, tmp_dirs=()):
+        self.directory = directory
+        self.size_limit = size_limit
+        self.partial_max_age = partial_max_age
+        self.gc_interval = gc_interval
+        self.tmp_dir = os.path.join(directory, 'tmp')
+        self.tmp_dirs = [self.tmp_dir] + list(tmp_dirs)
+        self.index_file = os.path.join(directory, 'index.json')
+        self.mods_directories_file = os.path.join(directory,
+                                                  'mods-directories.json')
+        self._accessed = {}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            os.path.join(config.cache_dir, 'releases'),
+            size_limit=config.get_size('cache', 'store_size'),
+            partial_max_age=config.getint('cache', 'partial_max_age'),
+            gc_interval=config.getint('cache', 'gc_interval'),
+            tmp_dirs=[os.path.join(config.factorio_write_path, 'tmp')],
+        )
+
+    def path(self, sha1):
+        return os.path.join(self.directory, sha1[:2], sha1 + '.zip')
+
+    def get(self, sha1):
+        """Return the path of a stored file, or None"""
+
+        path = self.path(sha1)
+        if os.path.isfile(path):
+            return path
+        return None
+
+    def download_path(self, release):
+        """Return the path to download a release to, before adding it"""
+
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        return os.path.join(self.tmp_dir, release.file_name)
+
+    @contextmanager
+    def lock(self, release):
+        """
+        Hold an exclusive lock on the download of a release.
+
+        The store and its tmp directory are shared by all the fac
+        instances of the host: the lock is held while downloading a
+        release and adding it to the store, so that concurrent downloads
+        of the same file don't overwrite each other's partial file.
+        """
+
+        if fcntl is None:
+            yield
+            return
+
+        path = self.download_path(release) + '.lock'
+
+        while True:
+            f = open(path, 'ab')
+            try:
+                fcntl.lockf(f, fcntl.LOCK_EX)
+
+                # The previous holder may have removed the file meanwhile
+                try:
+                    same = os.path.samestat(os.fstat(f.fileno()),
+                                            os.stat(path))
+                except FileNotFoundError:
+                    same = False
+            except BaseException:
+                f.close()
+                raise
+
+            if same:
+                break
+            f.close()
+
+        try:
+            yield
+        finally:
+            self._remove(path)
+            f.close()
+
+    def add(self, sha1, file_path):
+        """Move a downloaded (and verified) file into the store"""
+
+        path = self.path(sha1)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(file_path, path)
+        return path
+
+    def install(self, path, dest):
+        """Hard link (or copy) a stored file to dest, replacing it"""
+
+        sha1 = os.path.splitext(os.path.basename(path))[0]
+        self._accessed[sha1] = {
+            'file_name': os.path.basename(dest),
+            'last_access': time.time(),
+        }
+
+        # Renaming a hard link over another link to the same file does
+        # nothing, leaving the temporary file behind.
+        if os.path.isfile(dest) and os.path.samefile(path, dest):
+            return
+
+        tmp_path = '%s.%d.tmp' % (dest, os.getpid())
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+
+        try:
+            try:
+                os.link(path, tmp_path)
+            except OSError:
+                # Other file system, or no hard links support
+                shutil.copyfile(path, tmp_path)
+
+            os.replace(tmp_path, dest)
+        except BaseException:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _load_json(self, file):
+        try:
+            return JSONFile(file)
+        except ValueError:
+            # corrupted file
+            os.remove(file)
+            return JSONFile(file)
+
+    def flush(self):
+        """Save the last access times of the installed files"""
+
+        if not self._accessed:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        with self._load_json(self.index_file) as index:
+            entries = index.setdefault('entries', {})
+            entries.update(self._accessed)
+
+        self._accessed = {}
+
+    @property
+    def mods_directories(self):
+        """Mods directories that files were installed into"""
+
+        data = self._load_json(self.mods_directories_file)
+        return list(data.get('directories', []))
+
+    def register_mods_directory(self, mods_directory):
+        mods_directory = os.path.abspath(mods_directory)
+        data = self._load_json(self.mods_directories_file)
+        directories = data.get('directories', [])
+
+        if mods_directory not in directories:
+            os.makedirs(self.directory, exist_ok=True)
+            data.directories = directories + [mods_directory]
+            data.save()
+
+    def entries(self):
+        """Return the stored files, least recently used first"""
+
+        index = self._load_json(self.index_file).get('entries', {})
+        index.update(self._accessed)
+        entries = []
+
+        try:
+            subdirs = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+
+        for subdir in subdirs:
+            subdir = os.path.join(self.directory, subdir)
+            if subdir == self.tmp_dir or not os.path.isdir(subdir):
+                continue
+
+            for f in os.scandir(subdir):
+                if not f.name.endswith('.zip'):
+                    continue
+
+                try:
+                    st = f.stat()
+                except FileNotFoundError:
+                    continue
+
+                sha1 = f.name[:-len('.zip')]
+                info = index.get(sha1, {})
+                entries.append(StoreEntry(
+                    sha1, f.path, st.st_size, (st.st_dev, st.st_ino),
+                    info.get('file_name'),
+                    info.get('last_access', st.st_mtime),
+                ))
+
+        entries.sort(key=lambda entry: entry.last_access)
+        return entries
+
+    def referenced(self, entries):
+        """
+        Return the SHA-1 of the entries used by a registered mods directory.
+
+        A file is used if a mods directory contains a hard link to it,
+        or a file with the same name and size (a copy).
+        """
+
+        inodes = set()
+        files = set()
+
+        for mods_directory in self.mods_directories:
+            try:
+                mod_files = list(os.scandir(mods_directory))
+            except OSError:
+                continue
+
+            for f in mod_files:
+                if not f.name.endswith('.zip'):
+                    continue
+
+                try:
+                    st = f.stat()
+                except FileNotFoundError:
+                    continue
+
+                inodes.add((st.st_dev, st.st_ino))
+                files.add((f.name, st.st_size))
+
+        return {
+            entry.sha1 for entry in entries
+            if entry.inode in inodes or
+            (entry.file_name, entry.size) in files
+        }
+
+    def partial_files(self):
+        """Return the (path, size, mtime) of the partial downloads"""
+
+        res = []
+
+        for tmp_dir in self.tmp_dirs:
+            try:
+                files = list(os.scandir(tmp_dir))
+            except FileNotFoundError:
+                continue
+
+            for f in files:
+                if not f.name.endswith(PARTIAL_SUFFIXES):
+                    continue
+
+                try:
+                    st = f.stat()
+                except FileNotFoundError:
+                    continue
+
+                res.append((f.path, st.st_size, st.st_mtime))
+
+        return res
+
+    def stale_partial_files(self):
+        """
+        Return the partial downloads older than partial_max_age.
+
+        Younger ones may still be written by another running instance.
+        """
+
+        if self.partial_max_age is None:
+            return []
+
+        now = time.time()
+        return [(path, size, mtime)
+                for path, size, mtime in self.partial_files()
+                if now - mtime > self.partial_max_age]
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _forget(self, sha1s, last_gc=None):
+        """Remove entries from the index"""
+
+        if not os.path.isdir(self.directory):
+            return
+
+        with self._load_json(self.index_file) as index:
+            entries = index.get('entries', {})
+            for sha1 in sha1s:
+                entries.pop(sha1, None)
+                self._accessed.pop(sha1, None)
+
+            if last_gc is not None:
+                index.last_gc = last_gc
+
+    def gc(self, size_limit=None):
+        """
+        Remove the stale partial downloads, then evict the least recently
+        used files not in use until the store is under size_limit
+        (defaults to self.size_limit).
+        """
+
+        if size_limit is None:
+            size_limit = self.size_limit
+
+        now = time.time()
+        partials = freed = 0
+        evicted = []
+
+        for path, size, mtime in self.stale_partial_files():
+            self._remove(path)
+            partials += 1
+            freed += size
+
+        if size_limit:
+            entries = self.entries()
+            total = sum(entry.size for entry in entries)
+
+            # The mods directories are only scanned when over the limit
+            if total > size_limit:
+                referenced = self.referenced(entries)
+            else:
+                referenced = set()
+
+            for entry in entries:
+                if total <= size_limit:
+                    break
+
+                if entry.sha1 in referenced:
+                    continue
+
+                self._remove(entry.path)
+                evicted.append(entry.sha1)
+                total -= entry.size
+                freed += entry.size
+
+        self._forget(evicted, last_gc=now)
+        return GCResult(len(evicted), partials, freed)
+
+    def maybe_gc(self):
+        """
+        Run the garbage collection if it didn't run in the last
+        gc_interval seconds. Returns None if it didn't run.
+        """
+
+        if not os.path.isdir(self.directory):
+            return None
+
+        last_gc = self._load_json(self.index_file).get('last_gc', 0)
+        if time.time() - last_gc < self.gc_interval:
+            return None
+
+        return self.gc()
+
+    def clear(self):
+        """Remove all the stored files and stale partial downloads"""
+
+        entries = self.entries()
+        partial_files = self.stale_partial_files()
+
+        for entry in entries:
+            self._remove(entry.path)
+
+        for path, size, mtime in partial_files:
+            self._remove(path)
+
+        self._forget([entry.sha1 for entry in entries])
+
+        return GCResult(
+            len(entries), len(partial_files),
+            sum(entry.size for entry in entries) +
+            sum(size for path, size, mtime in partial_files)
+        )
@@ -0,0 +1,429 @@
+"""Dependency resolution"""
+
+from collections import namedtuple
+
+from fac.errors import ModNotFoundError, ResolutionError
+from fac.utils import parse_version, parse_dependency, match_game_version
+
+# Dependencies on the game itself can not be installed
+IGNORED_DEPENDENCIES = ('base', 'core')
+
+# Upper bound on the number of candidates tried before giving up
+MAX_STEPS = 10000
+
+Candidate = namedtuple('Candidate', 'name version release dependencies')
+Candidate.__doc__ = """
+A possible version of a mod: either the installed one (release is None)
+or a remote release.
+"""
+
+
+class Resolver:
+    """
+    Backtracking dependency resolver.
+
+    Given a list of requirements, it selects a version for every requested
+    mod and every (transitive) dependency, so that all version constraints
+    and incompatibilities are satisfied.
+
+    Installed mods are only taken into account when something being
+    installed depends on them. They are preferred whenever they satisfy
+    the constraints, then the most recent compatible releases are tried
+    in order. Releases that would break other installed mods are only
+    used when there is no other solution.
+
+    The missing dependencies of the other installed mods are then added
+    when possible. Problems with those mods never make the resolution
+    fail: they are reported in `warnings` instead.
+
+    Candidate lists are memoized per mod and game version, so that the
+    portal is queried at most once per mod and only when the installed
+    version is not suitable.
+    """
+
+    def __init__(self, manager, ignore_game_ver=False, held=()):
+        self.manager = manager
+        self.held = set(held)
+
+        if ignore_game_ver:
+            self.game_version = None
+        else:
+            self.game_version = manager.config.game_version_major
+
+        self._installed = None
+        self._dependents = None
+        self._remote = {}
+        self.warnings = []
+
+    @property
+    def installed(self):
+        """Mapping of installed mod names to their candidate"""
+
+        if self._installed is None:
+            self._installed = {}
+
+            for mod in self.manager.find_mods():
+                if self.game_version is not None and \
+                        mod.game_version != self.game_version:
+                    # Mods for another game version are not loaded
+                    continue
+
+                other = self._installed.get(mod.name)
+                if other and other.version >= mod.version:
+                    continue
+
+                self._installed[mod.name] = Candidate(
+                    mod.name, mod.version, None,
+                    self._parse_dependencies(mod.info),
+                )
+
+        return self._installed
+
+    @property
+    def dependents(self):
+        """
+        Mapping of mod names to the (kind, requirement, candidate) of the
+        installed mods that depend on them or are incompatible with them.
+        """
+
+        if self._dependents is None:
+            self._dependents = {}
+
+            for candidate in self.installed.values():
+                for kind, req in candidate.dependencies:
+                    self._dependents.setdefault(req.name, []).append(
+                        (kind, req, candidate)
+                    )
+
+        return self._dependents
+
+    def breaks_installed(self, candidate):
+        """Check if a release would break one of the installed mods"""
+
+        for kind, req in candidate.dependencies:
+            if kind == 'incompatible' and req.name in self.installed:
+                return True
+
+        for kind, req, source in self.dependents.get(candidate.name, []):
+            if source.name == candidate.name:
+                continue
+
+            if kind == 'incompatible' or \
+                    candidate.version not in req.specifier:
+                return True
+
+        return False
+
+    def remote_candidates(self, name):
+        """List of remote releases of a mod, most recent first"""
+
+        key = (name, self.game_version)
+
+        if key not in self._remote:
+            try:
+                mod = self.manager.api.get_mod(name)
+                releases = [release for release in mod.releases
+                            if match_game_version(release,
+                                                  self.game_version)]
+            except ModNotFoundError:
+                releases = []
+
+            candidates = [
+                Candidate(name, parse_version(release.version), release,
+                          self._parse_dependencies(
+                              release.get('info_json', {})
+                          ))
+                for release in releases
+            ]
+            candidates.sort(key=lambda c: c.version, reverse=True)
+            self._remote[key] = candidates
+
+        return self._remote[key]
+
+    def candidates(self, name, requested=False, protect=False):
+        if not requested:
+            if name in self.installed:
+                yield self.installed[name]
+
+            if name in self.held:
+                return
+
+        for candidate in self.remote_candidates(name):
+            if not (protect and self.breaks_installed(candidate)):
+                yield candidate
+
+    def _parse_dependencies(self, info):
+        deps = []
+
+        for dep in info.get('dependencies', []):
+            kind, req = parse_dependency(dep)
+
+            if req.name not in IGNORED_DEPENDENCIES:
+                deps.append((kind, req))
+
+        return deps
+
+    def resolve(self, requirements, deps=True):
+        """
+        Resolve the given list of requirements.
+
+        The requested mods are always (re)installed from the portal.
+        If deps is True, their missing dependencies are added as well,
+        then those of the installed mods (see the class documentation).
+
+        Returns the list of (name, release) pairs to install, in the order
+        they were selected, or raises ResolutionError.
+        """
+
+        state = _State()
+        requested = set()
+        pending = []
+        self.warnings = []
+
+        for req in requirements:
+            state.constraints.setdefault(req.name, []).append(
+                (req.specifier, None)
+            )
+            requested.add(req.name)
+            pending.append(req.name)
+
+        conflicts = self._solve(state, pending, requested, deps)
+        if conflicts:
+            raise ResolutionError(
+                "Could not resolve dependencies:\n    " +
+                "\n    ".join(conflicts)
+            )
+
+        if deps:
+            for name in sorted(self.installed):
+                self._add_installed(state, name, requested)
+
+        return [(candidate.name, candidate.release)
+                for candidate in state.order
+                if candidate.release is not None]
+
+    def _add_installed(self, state, name, requested):
+        """
+        Add an installed mod and its missing dependencies, if possible.
+        Otherwise, the state is left unchanged and the reasons are added
+        to the warnings.
+        """
+
+        candidate = state.chosen.get(name)
+        if candidate is not None and candidate.release is not None:
+            # Upgraded: its dependencies are already resolved
+            return
+
+        undo = conflicts = None
+
+        if candidate is None:
+            candidate = self.installed[name]
+            state.conflicts = []
+            undo = state.choose(candidate)
+            if not undo:
+                conflicts = state.conflicts
+
+        if conflicts is None:
+            conflicts = self._solve(state, [
+                req.name for kind, req in candidate.dependencies
+                if kind == 'required'
+            ], requested)
+
+            if conflicts and undo:
+                undo()
+
+        for conflict in conflicts or []:
+            if conflict not in self.warnings:
+                self.warnings.append(conflict)
+
+    def _solve(self, state, pending, requested, deps=True):
+        """
+        Select a candidate for each of the pending mods, and for the
+        dependencies of the selected releases (the required ones, and the
+        optional ones that are installed).
+
+        The dependencies of installed mods are not followed: they are
+        checked separately, without making the resolution fail.
+
+        Returns None, or the list of conflicts if there is no solution
+        (in which case the state is left unchanged).
+        """
+
+        for protect in (True, False):
+            conflicts = self._search(state, list(pending), requested, deps,
+                                     protect)
+            if not conflicts:
+                return None
+
+        return conflicts
+
+    def _search(self, state, pending, requested, deps, protect):
+        frames = []
+        steps = 0
+        i = 0
+
+        while True:
+            while i < len(pending) and pending[i] in state.chosen:
+                i += 1
+
+            if i == len(pending):
+                return None
+
+            name = pending[i]
+            frames.append(_Frame(
+                i, len(pending),
+                self.candidates(name, name in requested, protect)
+            ))
+            state.conflicts = []
+
+            while frames:
+                frame = frames[-1]
+
+                if frame.undo:
+                    frame.undo()
+                    frame.undo = None
+                    del pending[frame.size:]
+
+                for candidate in frame.candidates:
+                    steps += 1
+                    if steps > MAX_STEPS:
+                        for frame in reversed(frames):
+                            if frame.undo:
+                                frame.undo()
+                        return ["giving up after trying %d versions" %
+                                MAX_STEPS]
+
+                    frame.undo = state.choose(candidate, deps)
+                    if frame.undo:
+                        if deps and candidate.release is not None:
+                            pending.extend(
+                                req.name
+                                for kind, req in candidate.dependencies
+                                if kind == 'required' or
+                                (kind == 'optional' and
+                                 req.name in self.installed)
+                            )
+                        break
+                else:
+                    # No candidate left for this mod, backtrack
+                    frame = frames.pop()
+                    if not state.conflicts:
+                        state.conflicts.append(
+                            self._missing_message(pending[frame.index],
+                                                  state)
+                        )
+                    continue
+
+                break
+            else:
+                conflicts = []
+                for conflict in state.conflicts:
+                    if conflict not in conflicts:
+                        conflicts.append(conflict)
+
+                return conflicts
+
+            i = frame.index + 1
+
+    def _missing_message(self, name, state):
+        required_by = [source.name
+                       for spec, source in state.constraints.get(name, [])
+                       if source]
+
+        if not self.installed.get(name) and not self.remote_candidates(name):
+            message = "%s was not found" % name
+        else:
+            message = "no suitable version of %s was found" % name
+
+        if required_by:
+            message += " (required by %s)" % ', '.join(required_by)
+
+        return message
+
+
+class _Frame:
+    def __init__(self, index, size, candidates):
+        self.index = index
+        self.size = size
+        self.candidates = candidates
+        self.undo = None
+
+
+class _State:
+    def __init__(self):
+        self.chosen = {}
+        self.order = []
+        # name -> [(specifier, source candidate)]
+        self.constraints = {}
+        # name -> [source candidate]
+        self.excluded = {}
+        self.conflicts = []
+
+    def choose(self, candidate, deps=True):
+        """
+        Select a candidate if it is consistent with the current state.
+
+        Returns a function that cancels the selection, or None if the
+        candidate conflicts with the current state (the reason is added
+        to self.conflicts).
+        """
+
+        name = candidate.name
+
+        for spec, source in self.constraints.get(name, []):
+            if candidate.version not in spec:
+                self.conflicts.append("%s %s does not match %s%s" % (
+                    name, candidate.version, spec,
+                    ' (required by %s %s)' % (source.name, source.version)
+                    if source else ''
+                ))
+                return None
+
+        for source in self.excluded.get(name, []):
+            self.conflicts.append("%s is incompatible with %s %s" % (
+                name, source.name, source.version
+            ))
+            return None
+
+        dependencies = candidate.dependencies if deps else []
+
+        for kind, req in dependencies:
+            other = self.chosen.get(req.name)
+            if not other:
+                continue
+
+            if kind == 'incompatible':
+                self.conflicts.append("%s %s is incompatible with %s" % (
+                    name, candidate.version, req.name
+                ))
+                return None
+
+            if other.version not in req.specifier:
+                self.conflicts.append("%s %s requires %s, but %s %s is %s" % (
+                    name, candidate.version, req, req.name, other.version,
+                    'installed' if other.release is None else 'selected'
+                ))
+                return None
+
+        added = []
+
+        for kind, req in dependencies:
+            if kind == 'incompatible':
+                target = self.excluded.setdefault(req.name, [])
+                target.append(candidate)
+            else:
+                target = self.constraints.setdefault(req.name, [])
+                target.append((req.specifier, candidate))
+
+            added.append(target)
+
+        self.chosen[name] = candidate
+        self.order.append(candidate)
+
+        def undo():
+            for target in added:
+                target.pop()
+            self.order.pop()
+            del self.chosen[name]
+
+        return undo
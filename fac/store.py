@@ -0,0 +1,141 @@
+"""Local storage of the mods catalogue"""
+
+import os
+import json
+import sqlite3
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS mods (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    hash TEXT
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+'''
+
+
+class ModStore:
+    """
+    SQLite-backed mapping of mod names to their JSON data.
+
+    Records are decoded on access only, so looking up a mod does not
+    require loading the whole catalogue.
+
+    Along with the data, each mod can have a hash of its indexed fields
+    (used to keep the search index up to date). Sync state is kept as
+    JSON values in a separate key/value table.
+
+    Changes must be committed with commit().
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.file), exist_ok=True)
+            self._conn = sqlite3.connect(self.file)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __getitem__(self, name):
+        row = self.conn.execute(
+            'SELECT data FROM mods WHERE name = ?', (name,)
+        ).fetchone()
+
+        if row is None:
+            raise KeyError(name)
+
+        return json.loads(row[0])
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __setitem__(self, name, data):
+        self.update(name, data)
+
+    def update(self, name, data):
+        """Store the data of a mod, returning True if it changed"""
+
+        data = json.dumps(data, separators=(',', ':'))
+
+        # Keep the hash of existing records
+        cur = self.conn.execute(
+            'UPDATE mods SET data = ? WHERE name = ? AND data != ?',
+            (data, name, data)
+        )
+        if cur.rowcount:
+            return True
+
+        cur = self.conn.execute(
+            'INSERT OR IGNORE INTO mods (name, data) VALUES (?, ?)',
+            (name, data)
+        )
+        return bool(cur.rowcount)
+
+    def __delitem__(self, name):
+        cur = self.conn.execute('DELETE FROM mods WHERE name = ?', (name,))
+        if not cur.rowcount:
+            raise KeyError(name)
+
+    def __contains__(self, name):
+        return self.conn.execute(
+            'SELECT 1 FROM mods WHERE name = ?', (name,)
+        ).fetchone() is not None
+
+    def __iter__(self):
+        for name, in self.conn.execute('SELECT name FROM mods'):
+            yield name
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM mods').fetchone()[0]
+
+    def get_hash(self, name):
+        row = self.conn.execute(
+            'SELECT hash FROM mods WHERE name = ?', (name,)
+        ).fetchone()
+        return row and row[0]
+
+    def set_hash(self, name, digest):
+        self.conn.execute(
+            'UPDATE mods SET hash = ? WHERE name = ?', (digest, name)
+        )
+
+    def clear_hashes(self):
+        self.conn.execute('UPDATE mods SET hash = NULL')
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute(
+            'SELECT value FROM meta WHERE key = ?', (key,)
+        ).fetchone()
+
+        if row is None:
+            return default
+
+        return json.loads(row[0])
+
+    def set_meta(self, key, value):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+            (key, json.dumps(value))
+        )
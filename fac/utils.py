@@ -1,66 +1,292 @@
 import re
 import sys
 import json
+import codecs
+import threading
 import packaging.version
-from collections import UserDict, UserList, namedtuple
+from collections import namedtuple
+from collections.abc import MutableMapping, MutableSequence
+from functools import lru_cache
 
 
-class JSONList(UserList):
+class _JSONView:
+    # Plain base class: isinstance() checks are much faster than with the
+    # abstract base classes.
+    __slots__ = ()
+
+
+class JSONList(_JSONView, MutableSequence):
+    """
+    List view of JSON data, wrapping the dicts and lists it contains.
+
+    Wrappers of the items are cached as long as the underlying objects
+    are the same.
+    """
+
+    __slots__ = ('data', '_children')
+
     def __init__(self, data=None):
-        self.data = [] if data is None else data
+        self.data = [] if data is None else _unwrap(data)
+        self._children = None
 
     def __getitem__(self, i):
-        return _wrap(self.data[i])
+        if isinstance(i, slice):
+            return JSONList(self.data[i])
+
+        return _child(self, i, self.data[i])
 
     def __setitem__(self, i, val):
-        self.data[i] = _unwrap(val)
+        if isinstance(i, slice):
+            val = [_unwrap(v) for v in val]
+        else:
+            val = _unwrap(val)
+        self.data[i] = val
+
+    def __delitem__(self, i):
+        del self.data[i]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        for i, value in enumerate(self.data):
+            yield _child(self, i, value)
+
+    def insert(self, i, val):
+        self.data.insert(i, _unwrap(val))
+
+    def copy(self):
+        return JSONList(list(self.data))
+
+    def __eq__(self, other):
+        return self.data == _unwrap(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.data)
 
     def __str__(self):
         return json.dumps(self.data)
 
 
-class JSONDict(UserDict):
-    data = None
+class JSONDict(_JSONView, MutableMapping):
+    """
+    Dict view of JSON data, allowing attribute access to the keys.
+
+    Attribute access wraps the dicts and lists (item access doesn't).
+    Wrappers of the values are cached as long as the underlying objects
+    are the same.
+    """
+
+    __slots__ = ('data', '_children')
 
     def __init__(self, data=None):
-        self.data = {} if data is None else data
+        # bypass __setattr__
+        object.__setattr__(self, 'data', {} if data is None else _unwrap(data))
+        object.__setattr__(self, '_children', None)
 
     def __getattr__(self, name):
+        # Only called when there is no actual attribute with this name
+        if name in JSONDict.__slots__:
+            raise AttributeError(name)
+
         try:
-            return super().__getattribute__(name)
-        except AttributeError as ex:
-            try:
-                return _wrap(self.data[name])
-            except KeyError:
-                raise ex
+            value = self.data[name]
+        except KeyError:
+            raise AttributeError(
+                "%r object has no attribute %r" % (type(self).__name__, name)
+            ) from None
+
+        return _child(self, name, value)
 
     def __setattr__(self, name, val):
-        try:
-            super().__getattribute__(name)
-        except AttributeError:
-            self.data[name] = _unwrap(val)
+        if hasattr(type(self), name):
+            object.__setattr__(self, name, val)
         else:
-            return super().__setattr__(name, val)
+            self.data[name] = _unwrap(val)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, val):
+        self.data[key] = _unwrap(val)
+
+    def __delitem__(self, key):
+        del self.data[key]
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def copy(self):
+        return JSONDict(dict(self.data))
+
+    def __eq__(self, other):
+        return self.data == _unwrap(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.data)
 
     def __str__(self):
         return json.dumps(self.data, sort_keys=True)
 
 
-def _wrap(obj):
-    if isinstance(obj, dict):
-        return JSONDict(obj)
-    elif isinstance(obj, list):
-        return JSONList(obj)
+def _child(parent, key, value):
+    """Return the (cached) wrapper of a value contained in parent"""
+
+    if not isinstance(value, (dict, list)):
+        return value
+
+    children = parent._children
+    if children is None:
+        children = parent._children = {}
+    else:
+        child = children.get(key)
+        if child is not None and child.data is value:
+            return child
+
+    if isinstance(value, dict):
+        child = JSONDict(value)
     else:
-        return obj
+        child = JSONList(value)
+
+    children[key] = child
+    return child
 
 
 def _unwrap(obj):
-    if isinstance(obj, UserList) or isinstance(obj, UserDict):
+    if isinstance(obj, _JSONView):
         return obj.data
     return obj
 
 
+class JSONStreamReader:
+    """
+    Incremental reader of JSON data coming from an iterable of byte chunks.
+
+    Values are decoded one at a time, reading only as many chunks as
+    needed to decode them.
+    """
+
+    whitespace = ' \t\r\n'
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Read the next chunk. Returns False if there is none left"""
+
+        if self.eof:
+            return False
+
+        # drop the already consumed data
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.eof = True
+            self.buf += self.text_decoder.decode(b'', final=True)
+        else:
+            self.buf += self.text_decoder.decode(chunk)
+
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character"""
+
+        while True:
+            while (self.pos < len(self.buf) and
+                   self.buf[self.pos] in self.whitespace):
+                self.pos += 1
+
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON data")
+
+    def expect(self, chars):
+        """Consume the next character, which must be one of `chars`"""
+
+        char = self.peek()
+
+        if char not in chars:
+            raise ValueError("Expected one of %r, got %r" % (chars, char))
+
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next JSON value"""
+
+        self.peek()
+
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if self.fill():
+                    continue
+                raise
+
+            # A value ending with the buffer might be truncated (eg. numbers)
+            if end == len(self.buf) and self.fill():
+                continue
+
+            self.pos = end
+            return obj
+
+
+def iter_json_array(chunks, key):
+    """
+    Incrementally parse a JSON object from an iterable of byte chunks.
+
+    Yields the items of the array stored under `key` one at a time.
+    Other members of the object are decoded and discarded.
+    """
+
+    reader = JSONStreamReader(chunks)
+    reader.expect('{')
+
+    if reader.peek() == '}':
+        return
+
+    while True:
+        name = reader.value()
+        reader.expect(':')
+
+        if name != key:
+            reader.value()
+        else:
+            reader.expect('[')
+
+            while reader.peek() != ']':
+                yield reader.value()
+
+                if reader.peek() != ']':
+                    reader.expect(',')
+
+            reader.expect(']')
+
+        if reader.expect(',}') == '}':
+            return
+
+
 def prompt(prompt="Continue?", choices="Y/n"):
     default_choice = None
     for choice in choices:
@@ -94,15 +320,81 @@ Requirement.__str__ = lambda self: '%s%s' % (self.name, self.specifier)
 
 
 class Version(packaging.version.Version):
+    """
+    A version number that can also be compared to version strings.
+
+    Use parse_version() instead of creating instances directly, unless
+    a distinct object is really needed.
+    """
+
     def __init__(self, version):
         if isinstance(version, packaging.version.Version):
             version = str(version)
         super().__init__(version)
 
-    def _compare(self, other, method):
-        if isinstance(other, str):
-            other = Version(other)
-        return super()._compare(other, method)
+    def __hash__(self):
+        return super().__hash__()
+
+    def __eq__(self, other):
+        return super().__eq__(_coerce_version(other))
+
+    def __ne__(self, other):
+        return super().__ne__(_coerce_version(other))
+
+    def __lt__(self, other):
+        return super().__lt__(_coerce_version(other))
+
+    def __le__(self, other):
+        return super().__le__(_coerce_version(other))
+
+    def __gt__(self, other):
+        return super().__gt__(_coerce_version(other))
+
+    def __ge__(self, other):
+        return super().__ge__(_coerce_version(other))
+
+
+def _coerce_version(other):
+    if isinstance(other, str):
+        return parse_version(other)
+    return other
+
+
+# The same few thousand version strings occur over and over in the
+# catalogue, so parsed versions and requirements are cached. The returned
+# objects are shared and must not be modified.
+
+@lru_cache(maxsize=8192)
+def parse_version(text):
+    """Return the (shared) Version object for a version string"""
+
+    return Version(text)
+
+
+def sort_releases(releases, reverse=True):
+    """
+    Sort a list of releases by version (most recent first by default).
+
+    The version of each release is only parsed once.
+    """
+
+    keys = [parse_version(release['version']) for release in releases]
+    order = sorted(range(len(releases)), key=keys.__getitem__,
+                   reverse=reverse)
+    return [releases[i] for i in order]
+
+
+@lru_cache(maxsize=1024)
+def parse_specifier(text):
+    """
+    Return the (shared) SpecifierSet for a specifier string like '>=1.0'.
+
+    Unlike full requirements, there are few distinct specifiers: this
+    cache stays small and is rarely missed.
+    """
+
+    from packaging.specifiers import SpecifierSet
+    return SpecifierSet(text)
 
 
 def parse_requirement(text):
@@ -112,23 +404,99 @@ def parse_requirement(text):
     Returns a (name, specifier) named tuple.
     """
 
-    from packaging.specifiers import SpecifierSet
     match = REQUIREMENT_RE.match(text)
     if not match:
         raise ValueError("Invalid requirement: %s" % text)
     name = match.group('name').strip()
-    spec = SpecifierSet(match.group('specifier') or '')
+    spec = parse_specifier((match.group('specifier') or '').strip())
     return Requirement(name, spec)
 
 
+DEPENDENCY_PREFIXES = [
+    ('(?)', 'optional'),  # hidden optional dependency
+    ('?', 'optional'),
+    ('!', 'incompatible'),
+    ('~', 'required'),  # does not affect load order
+]
+
+
+def parse_dependency(text):
+    """
+    Parse a mod dependency such as '? foo >= 1.0' or '! bar'.
+
+    Returns a (kind, requirement) tuple, where kind is one of 'required',
+    'optional' or 'incompatible'.
+    """
+
+    text = text.strip()
+    kind = 'required'
+
+    for prefix, prefix_kind in DEPENDENCY_PREFIXES:
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+            kind = prefix_kind
+            break
+
+    # Factorio uses '=' for exact version matches
+    text = re.sub(r'(?<![<>=!])=(?!=)', '==', text)
+
+    return kind, parse_requirement(text)
+
+
+SIZE_RE = re.compile(
+    r'^\s*(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>[KMGT]?)(?:iB|B)?\s*$',
+    re.IGNORECASE
+)
+SIZE_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+
+def parse_size(text):
+    """
+    Parse a size such as '512', '10K', '50M' or '2G' (binary units).
+
+    Returns a number of bytes.
+    """
+
+    match = SIZE_RE.match(text)
+    if not match:
+        raise ValueError("Invalid size: %s" % text)
+
+    value = float(match.group('value'))
+    unit = SIZE_UNITS[match.group('unit').upper()]
+    return int(value * unit)
+
+
+def format_size(size):
+    """Format a number of bytes using binary units, eg. '1.5M'"""
+
+    for unit in ('', 'K', 'M', 'G'):
+        if size < 1024:
+            break
+        size /= 1024
+    else:
+        unit = 'T'
+
+    if not unit:
+        return '%d' % size
+    return '%.1f%s' % (size, unit)
+
+
 def parse_game_version(info):
-    if 'info_json' in info:
-        info = info.info_json
-    try:
-        version = '.'.join(info.factorio_version.split('.')[:2])
-        return Version(version)
-    except AttributeError:
-        return Version('0.12')
+    # Item access also works on raw dicts, and doesn't create wrappers
+    info = info.get('info_json', info)
+    version = info.get('factorio_version')
+
+    if not version:
+        return parse_version('0.12')
+
+    return parse_major_version(version)
+
+
+@lru_cache(maxsize=256)
+def parse_major_version(text):
+    """Return the major version ('0.15') of a version string ('0.15.2')"""
+
+    return parse_version('.'.join(text.split('.')[:2]))
 
 
 def match_game_version(release, game_version):
@@ -158,7 +526,7 @@ class ProgressWidget:
         print("\r" + text.ljust(self.maxprint),
               end='', flush=True, file=self.file)
 
-    def error(self, exc):
+    def error(self, exc=None):
         if not self.done:
             self.print("%s error" % self.text)
             self.done = True
@@ -198,6 +566,74 @@ class ProgressWidget:
             self.print(self.text)
 
 
+class MultiProgressWidget(ProgressWidget):
+    """
+    Aggregated progress display for several concurrent transfers.
+
+    Each transfer reports its progress under its own key; a single line
+    shows the number of finished transfers and the overall percentage.
+    This is thread-safe.
+    """
+
+    def __init__(self, text, count, file=sys.stderr):
+        self.lock = threading.RLock()
+        self.count = count
+        self.finished = 0
+        self.transfers = {}
+        super().__init__(text, file)
+
+    def update(self, key, cur, tot):
+        with self.lock:
+            self.transfers[key] = (cur, tot)
+            self.refresh()
+
+    def item_done(self, key, message=None):
+        with self.lock:
+            self.finished += 1
+            cur, tot = self.transfers.get(key, (0, 0))
+            self.transfers[key] = (tot or cur, tot or cur)
+            if message:
+                self.message(message)
+            self.refresh()
+
+    def message(self, text):
+        """Print a line of text without breaking the progress line"""
+
+        with self.lock:
+            if self.done:
+                print(text, file=self.file)
+                return
+
+            print("\r" + text.ljust(self.maxprint), file=self.file)
+            self.maxprint = 0
+            self.progress = None
+            self.refresh()
+
+    def refresh(self):
+        if self.done:
+            return
+
+        cur = sum(cur for cur, tot in self.transfers.values())
+        tot = sum(tot for cur, tot in self.transfers.values())
+        progress = int(100 * cur / tot) if tot else 0
+
+        if self.progress == progress and self.finished < self.count:
+            return
+
+        self.progress = progress
+        self.print("%s %d/%d %d %%" % (
+            self.text, self.finished, self.count, progress
+        ))
+
+        if self.finished == self.count:
+            self.finish()
+
+    def __call__(self, cur, tot):
+        # per-transfer progress is reported through update()
+        with self.lock:
+            self.refresh()
+
+
 def start_iter(it):
     first = next(it)
 
@@ -0,0 +1,341 @@
+"""
+Helpers to write zip archives.
+
+Members are compressed in parallel, and the compressed data of unchanged
+members can be copied from another archive without recompressing it.
+"""
+
+import os
+import time
+import zlib
+import shutil
+import struct
+import tempfile
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from zipfile import (ZipFile, ZipInfo, BadZipFile, ZIP_STORED, ZIP_DEFLATED,
+                     ZIP64_LIMIT)
+
+COMPRESSION_TYPES = {
+    'stored': ZIP_STORED,
+    'deflated': ZIP_DEFLATED,
+}
+
+BUFFER_SIZE = 1024 * 1024
+
+# Compressed members bigger than this are spooled to disk until written
+SPOOL_SIZE = 16 * 1024 * 1024
+
+# Local file header
+FILE_HEADER = struct.Struct('<4s2B4HL2L2H')
+FILE_HEADER_MAGIC = b'PK\003\004'
+FH_FILENAME_LENGTH = 10
+FH_EXTRA_FIELD_LENGTH = 11
+
+FLAG_ENCRYPTED = 0x1
+
+
+def compression_type(name):
+    try:
+        return COMPRESSION_TYPES[name]
+    except KeyError:
+        raise ValueError(
+            "Invalid compression: %s (expected one of: %s)" % (
+                name, ', '.join(sorted(COMPRESSION_TYPES))
+            )
+        ) from None
+
+
+def make_zipinfo(arcname, st):
+    """Return a ZipInfo for a file with the given stat result"""
+
+    date_time = time.localtime(st.st_mtime)[:6]
+    if date_time[0] < 1980:
+        date_time = (1980, 1, 1, 0, 0, 0)
+
+    zinfo = ZipInfo(arcname, date_time)
+    zinfo.external_attr = (st.st_mode & 0xFFFF) << 16
+    zinfo.file_size = st.st_size
+    return zinfo
+
+
+def zip_time(date_time):
+    """Truncate a date_time tuple to the resolution of zip files"""
+    return date_time[:5] + (date_time[5] // 2 * 2,)
+
+
+def file_crc(path):
+    crc = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(BUFFER_SIZE)
+            if not chunk:
+                return crc
+            crc = zlib.crc32(chunk, crc)
+
+
+def reuse_member(path, arcname, old, compress_type, archive_time):
+    """
+    Check if a file is unchanged from a member of an existing archive.
+
+    The file is considered unchanged if it has the same size and either
+    the same modification time or the same CRC.
+
+    Zip files only store times with a 2 seconds resolution, so the
+    modification time is only trusted for files older than that when
+    the archive was written (archive_time).
+
+    Returns the ZipInfo of the new member (with the sizes and CRC of the
+    old one) or None if the file must be compressed again.
+    """
+
+    st = os.stat(path)
+
+    if (old.compress_type != compress_type or
+            old.flag_bits & FLAG_ENCRYPTED or
+            old.file_size != st.st_size):
+        return None
+
+    zinfo = make_zipinfo(arcname, st)
+
+    same_time = (st.st_mtime + 2 <= archive_time and
+                 zip_time(zinfo.date_time) == zip_time(old.date_time))
+
+    if not same_time and file_crc(path) != old.CRC:
+        return None
+
+    zinfo.compress_type = old.compress_type
+    zinfo.compress_size = old.compress_size
+    zinfo.CRC = old.CRC
+    return zinfo
+
+
+def read_raw(zipfile, zinfo):
+    """Yield the compressed data of a member of an archive, in chunks"""
+
+    fp = zipfile.fp
+    fp.seek(zinfo.header_offset)
+    header = FILE_HEADER.unpack(fp.read(FILE_HEADER.size))
+
+    if header[0] != FILE_HEADER_MAGIC:
+        raise BadZipFile("Bad magic number for file header")
+
+    fp.seek(header[FH_FILENAME_LENGTH] + header[FH_EXTRA_FIELD_LENGTH], 1)
+    remaining = zinfo.compress_size
+
+    while remaining:
+        chunk = fp.read(min(BUFFER_SIZE, remaining))
+        if not chunk:
+            raise BadZipFile("Truncated file: %s" % zinfo.filename)
+        remaining -= len(chunk)
+        yield chunk
+
+
+def preallocate(fd, size):
+    """Allocate the disk space of a file before writing it, if supported"""
+
+    if size and hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            # Not supported by the file system
+            pass
+
+
+def compress_file(path, arcname, compress_type=ZIP_DEFLATED, level=-1):
+    """
+    Compress a file for inclusion in a zip archive.
+
+    Returns the ZipInfo (with sizes and CRC set) and a file object
+    positioned at the start of the compressed data.
+    """
+
+    zinfo = make_zipinfo(arcname, os.stat(path))
+    zinfo.compress_type = compress_type
+
+    if compress_type == ZIP_DEFLATED:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    else:
+        compressor = None
+
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    crc = size = 0
+
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(BUFFER_SIZE)
+                if not chunk:
+                    break
+
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+
+                if compressor:
+                    chunk = compressor.compress(chunk)
+                out.write(chunk)
+
+        if compressor:
+            out.write(compressor.flush())
+    except Exception:
+        out.close()
+        raise
+
+    zinfo.file_size = size
+    zinfo.CRC = crc
+    zinfo.compress_size = out.tell()
+    out.seek(0)
+    return zinfo, out
+
+
+def write_raw(zipfile, zinfo, chunks):
+    """
+    Append a member whose data is already compressed.
+
+    zinfo must have its compression type, sizes and CRC set.
+    chunks is an iterable of the compressed data.
+    """
+
+    zip64 = (zinfo.file_size > ZIP64_LIMIT or
+             zinfo.compress_size > ZIP64_LIMIT)
+
+    zipfile._writecheck(zinfo)
+    zipfile._didModify = True
+
+    zinfo.header_offset = zipfile.fp.tell()
+    zipfile.fp.write(zinfo.FileHeader(zip64))
+    for chunk in chunks:
+        zipfile.fp.write(chunk)
+
+    zipfile.start_dir = zipfile.fp.tell()
+    zipfile.filelist.append(zinfo)
+    zipfile.NameToInfo[zinfo.filename] = zinfo
+
+
+def compress_data(zinfo, data, level=-1):
+    """
+    Compress the data of a member.
+
+    Sets the sizes and CRC of zinfo and returns the compressed data.
+    """
+
+    zinfo.file_size = len(data)
+    zinfo.CRC = zlib.crc32(data)
+
+    if zinfo.compress_type == ZIP_DEFLATED:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        data = compressor.compress(data) + compressor.flush()
+
+    zinfo.compress_size = len(data)
+    return data
+
+
+def replace_members(path, members, level=-1):
+    """
+    Replace the data of some members of a zip archive.
+
+    members is a dict of arcnames to their new (uncompressed) data.
+    The other members are copied without being decompressed.
+    The archive is rewritten to a temporary file which then atomically
+    replaces the original one.
+    """
+
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+
+    try:
+        with ZipFile(path) as source, ZipFile(tmp_path, 'w') as dest:
+            for old in source.infolist():
+                if old.flag_bits & FLAG_ENCRYPTED:
+                    raise BadZipFile("Encrypted file: %s" % old.filename)
+
+                zinfo = ZipInfo(old.filename, old.date_time)
+                zinfo.create_system = old.create_system
+                zinfo.external_attr = old.external_attr
+                zinfo.compress_type = old.compress_type
+
+                if old.filename in members:
+                    if zinfo.compress_type not in COMPRESSION_TYPES.values():
+                        zinfo.compress_type = ZIP_DEFLATED
+
+                    data = compress_data(zinfo, members[old.filename], level)
+                    write_raw(dest, zinfo, [data])
+                else:
+                    zinfo.file_size = old.file_size
+                    zinfo.compress_size = old.compress_size
+                    zinfo.CRC = old.CRC
+                    write_raw(dest, zinfo, read_raw(source, old))
+
+            dest.comment = source.comment
+
+        shutil.copymode(path, tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    os.replace(tmp_path, path)
+
+
+def write_files(zipfile, files, compress_type=ZIP_DEFLATED, level=-1,
+                jobs=None, source=None):
+    """
+    Add files to a zip archive opened for writing.
+
+    files is an iterable of (path, arcname) tuples.
+    The files are compressed by a thread pool (zlib releases the GIL) and
+    appended to the archive, in order, by the calling thread.
+
+    source is an optional previous version of the archive: the data of
+    its members is copied as is for the files that did not change.
+
+    Returns the number of members copied from source.
+    """
+
+    jobs = jobs or os.cpu_count() or 1
+    pending = deque()
+    reused = 0
+
+    if source:
+        archive_time = os.fstat(source.fp.fileno()).st_mtime
+
+    def prepare(path, arcname):
+        old = source.NameToInfo.get(arcname) if source else None
+
+        if old is not None:
+            zinfo = reuse_member(path, arcname, old, compress_type,
+                                 archive_time)
+            if zinfo is not None:
+                return zinfo, old
+
+        return compress_file(path, arcname, compress_type, level)
+
+    def write_next():
+        nonlocal reused
+        zinfo, data = pending.popleft().result()
+
+        if isinstance(data, ZipInfo):
+            write_raw(zipfile, zinfo, read_raw(source, data))
+            reused += 1
+        else:
+            with data:
+                write_raw(zipfile, zinfo,
+                          iter(lambda: data.read(BUFFER_SIZE), b''))
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        try:
+            for path, arcname in files:
+                pending.append(executor.submit(prepare, path, arcname))
+
+                # Limit the number of compressed members waiting
+                if len(pending) >= 2 * jobs:
+                    write_next()
+
+            while pending:
+                write_next()
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+
+    return reused
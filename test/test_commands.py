@@ -0,0 +1,171 @@
+from unittest import TestCase
+import importlib
+
+from fac.commands import CommandRegistry
+from fac.commands.all import COMMANDS
+from fac.main import find_command_name
+
+
+class TestCommandList(TestCase):
+    def setUp(self):
+        for name, module, help in COMMANDS:
+            importlib.import_module(module)
+
+    def test_help(self):
+        for name, module, help in COMMANDS:
+            command_class = CommandRegistry.find(name)
+            self.assertIsNotNone(command_class, name)
+            self.assertEqual(command_class.__module__, module)
+
+            doc = (command_class.__doc__ or '').strip().splitlines()
+            self.assertEqual(command_class.help or doc[0], help)
+
+    def test_complete(self):
+        names = [name for name, module, help in COMMANDS]
+        for command_class in CommandRegistry.commands:
+            self.assertIn(command_class.name, names)
+
+
+class TestFindCommandName(TestCase):
+    def test_find(self):
+        self.assertEqual(find_command_name(['list']), 'list')
+        self.assertEqual(find_command_name(['-v', 'list', '-F', 'x']),
+                         'list')
+        self.assertEqual(find_command_name(['-g', '0.15', 'show', 'x']),
+                         'show')
+        self.assertEqual(find_command_name(['--game-version=0.15', 'show']),
+                         'show')
+        self.assertEqual(find_command_name(['--', 'list']), 'list')
+        self.assertIsNone(find_command_name(['-h']))
+
+
+class TestOutdated(TestCase):
+    def test_check(self):
+        from fac.commands.outdated import OutdatedCommand
+        from fac.utils import JSONDict, Version
+
+        def release(version, factorio='0.15'):
+            return {'version': version,
+                    'info_json': {'factorio_version': factorio}}
+
+        class Mod:
+            def __init__(self, name, version):
+                self.name = name
+                self.version = Version(version)
+                self.enabled = self.packed = True
+                self.held = False
+
+        class Manager:
+            config = None
+            db = JSONDict({'mods': {
+                'a': {'latest_release': release('1.1.0')},
+                'b': {'latest_release': release('2.0.0', '0.16')},
+                'c': {'latest_release': release('0.9.0', '0.16')},
+            }})
+
+        command = OutdatedCommand(Manager())
+        command.fetch_releases = lambda names, game_ver: {
+            name: Version('1.2.0') for name in names
+        }
+
+        report = command.check([Mod('a', '1.0.0'), Mod('b', '1.0.0'),
+                                Mod('c', '1.0.0'), Mod('d', '1.0.0')],
+                               Version('0.15'))
+
+        self.assertEqual(report['outdated'], 2)
+        self.assertEqual(
+            [(m['name'], m['latest'], m['outdated'], bool(m['error']))
+             for m in report['mods']],
+            [('a', '1.1.0', True, False),
+             ('b', '1.2.0', True, False),
+             ('c', None, False, False),
+             ('d', None, False, True)]
+        )
+
+    def test_json_after_sync(self):
+        import io
+        import json
+        import tempfile
+        from argparse import Namespace
+        from contextlib import redirect_stdout
+
+        from fac.commands.outdated import OutdatedCommand
+        from fac.db import DB
+        from fac.utils import Version
+        from test.test_db import FakeAPI, FakeConfig, make_mod
+
+        class Mod:
+            name = 'foo'
+            version = Version('1.0.0')
+            enabled = packed = True
+            held = False
+
+        latest = {'version': '1.1.0',
+                  'info_json': {'factorio_version': '0.15'}}
+        api = FakeAPI([make_mod('foo', '2017-01-01T00:00:00Z',
+                                latest_release=latest)])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config = FakeConfig(tmp)
+            config.game_version_major = Version('0.15')
+
+            class Manager:
+                db = DB(config, api)
+
+                def find_mods(self):
+                    return [Mod()]
+
+            Manager.config = config
+            command = OutdatedCommand(Manager())
+            out = io.StringIO()
+
+            try:
+                with redirect_stdout(out):
+                    command.run(Namespace(json=True, sync=True,
+                                          ignore_game_ver=False))
+            finally:
+                Manager.db.store.close()
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['outdated'], 1)
+        self.assertEqual(report['mods'][0]['latest'], '1.1.0')
+
+    def test_json_invalid_mod(self):
+        import io
+        import os
+        import json
+        import tempfile
+        from argparse import Namespace
+        from contextlib import redirect_stdout, redirect_stderr
+
+        from fac.commands.outdated import OutdatedCommand
+        from fac.mods import ModManager
+        from test.test_installer import FakeConfig, make_zip
+
+        class FakeDB:
+            mods = {'foo': {'latest_release': {
+                'version': '1.1.0',
+                'info_json': {'factorio_version': '0.15'},
+            }}}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config = FakeConfig(tmp)
+            manager = ModManager(config, db=FakeDB())
+            manager.load()
+
+            for name, data in (('foo_1.0.0.zip', make_zip('foo', '1.0.0')),
+                               ('broken_1.0.0.zip', b'not a zip')):
+                with open(os.path.join(config.mods_directory, name),
+                          'wb') as f:
+                    f.write(data)
+
+            out = io.StringIO()
+            err = io.StringIO()
+            with redirect_stdout(out), redirect_stderr(err):
+                OutdatedCommand(manager).run(Namespace(
+                    json=True, sync=False, ignore_game_ver=False
+                ))
+
+        report = json.loads(out.getvalue())
+        self.assertEqual([mod['name'] for mod in report['mods']], ['foo'])
+        self.assertIn("Warning: invalid mod", err.getvalue())
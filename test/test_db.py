@@ -0,0 +1,94 @@
+import io
+import shutil
+import os.path
+import tempfile
+from configparser import ConfigParser
+from contextlib import redirect_stderr
+from unittest import TestCase
+
+from fac.db import DB
+from fac.files import Config
+from fac.utils import JSONDict
+
+
+def make_mod(name, updated_at, downloads=0, **fields):
+    return dict({
+        'name': name,
+        'title': name.title(),
+        'owner': 'someone',
+        'summary': 'The %s mod' % name,
+        'downloads_count': downloads,
+        'updated_at': updated_at,
+    }, **fields)
+
+
+class FakeConfig(ConfigParser):
+    def __init__(self, cache_dir):
+        super().__init__(allow_no_value=True)
+        self.read_string(Config.default_config)
+        self.cache_dir = cache_dir
+
+
+class FakeAPI:
+    def __init__(self, mods):
+        self.mods = mods
+
+    def iter_mods(self, progress=None, page_size='max'):
+        for mod in self.mods:
+            yield JSONDict(mod)
+
+    def iter_mod_pages(self, **params):
+        mods = sorted(self.mods, key=lambda mod: mod['updated_at'],
+                      reverse=True)
+        yield [JSONDict(mod) for mod in mods]
+
+
+class TestSync(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.api = FakeAPI([
+            make_mod('foo', '2017-01-01T00:00:00Z'),
+            make_mod('bar', '2017-01-02T00:00:00Z'),
+        ])
+        self.db = DB(FakeConfig(self.tmp.name), self.api)
+
+    def tearDown(self):
+        self.db.store.close()
+        self.tmp.cleanup()
+
+    def sync(self, full=None):
+        out = io.StringIO()
+        with redirect_stderr(out):
+            self.db.update(full)
+        return out.getvalue()
+
+    def test_messages(self):
+        self.assertIn("Updated mods database (2 changed)", self.sync())
+        self.assertIn("Index is up to date", self.sync(False))
+
+        # Data change that doesn't affect the search index
+        self.api.mods[1] = make_mod('bar', '2017-01-03T00:00:00Z')
+        self.assertIn("Updated mods database (1 changed)", self.sync(False))
+        self.assertEqual(self.db.mods['bar']['updated_at'],
+                         '2017-01-03T00:00:00Z')
+
+        self.assertIn("Index is up to date", self.sync(True))
+
+    def test_index_rebuilt(self):
+        self.api.mods.append(make_mod('baz', '2017-01-03T00:00:00Z'))
+        self.sync()
+        self.db.store.close()
+
+        shutil.rmtree(os.path.join(self.tmp.name, 'index'))
+        self.api.mods[2] = make_mod('baz', '2017-01-04T00:00:00Z')
+
+        self.db = DB(FakeConfig(self.tmp.name), self.api)
+        self.assertFalse(self.db.needs_full_sync())
+
+        with redirect_stderr(io.StringIO()):
+            self.db.maybe_update()
+
+        self.assertEqual(sorted(mod.name for mod in self.db.search('')),
+                         ['bar', 'baz', 'foo'])
+        self.assertEqual([mod.name for mod in self.db.search('foo')],
+                         ['foo'])
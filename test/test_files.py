@@ -0,0 +1,66 @@
+import os
+import json
+import tempfile
+from unittest import TestCase, mock
+
+from fac.files import Config
+
+
+class TestConfigDiscovery(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.factorio = os.path.join(self.tmp.name, 'factorio')
+        self.cache_dir = os.path.join(self.tmp.name, 'cache')
+        self.info_json = os.path.join(self.factorio, 'data', 'base',
+                                      'info.json')
+
+        for path in ('data/base', 'config', 'mods'):
+            os.makedirs(os.path.join(self.factorio, path))
+
+        self.set_version('0.15.1')
+
+        patches = [
+            mock.patch('fac.files.FACTORIO_SEARCH_PATHS', [self.factorio]),
+            mock.patch.object(Config, 'cache_dir', self.cache_dir),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def set_version(self, version):
+        with open(self.info_json, 'w') as f:
+            json.dump({'version': version}, f)
+
+    def config(self):
+        return Config(os.path.join(self.tmp.name, 'config.ini'))
+
+    def test_discovery(self):
+        config = self.config()
+        data_path = os.path.join(self.factorio, 'data')
+
+        with mock.patch.object(Config, 'is_factorio_data_path',
+                               wraps=Config.is_factorio_data_path) as check:
+            self.assertEqual(config.factorio_data_path, data_path)
+            self.assertEqual(config.factorio_write_path, self.factorio)
+            self.assertEqual(config.game_version, '0.15.1')
+            self.assertEqual(str(config.game_version_major), '0.15')
+            calls = check.call_count
+
+            config.factorio_data_path
+            config.game_version_major
+            self.assertEqual(check.call_count, calls)
+
+        # The result is persisted until info.json changes
+        config = self.config()
+        self.assertEqual(config.factorio_data_path, data_path)
+        self.assertEqual(config.game_version, '0.15.1')
+
+        self.set_version('0.16.2')
+        st = os.stat(self.info_json)
+        os.utime(self.info_json, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+
+        config = self.config()
+        self.assertEqual(config.game_version, '0.16.2')
@@ -0,0 +1,68 @@
+import os
+import json
+import errno
+import tempfile
+from unittest import TestCase, mock
+
+from fac.api import API
+from fac.httpcache import ResponseCache
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self.text = json.dumps(data)
+        self.headers = {'etag': '"1"'}
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        pass
+
+
+class TestResponseCache(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.url = 'https://example.com/api/mods/foo'
+        self.resp = FakeResponse({'name': 'foo'})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_store(self):
+        cache = ResponseCache(os.path.join(self.tmp.name, 'cache'))
+        cache.store(self.url, self.resp)
+        self.assertEqual(cache.get(self.url)['content'], self.resp.text)
+
+    def test_unwritable_directory(self):
+        # A file where the cache directory should be
+        path = os.path.join(self.tmp.name, 'cache')
+        open(path, 'w').close()
+
+        cache = ResponseCache(path)
+        entry = cache.store(self.url, self.resp)
+        self.assertEqual(entry['content'], self.resp.text)
+        self.assertIsNone(cache.get(self.url))
+
+    def test_disk_full(self):
+        directory = os.path.join(self.tmp.name, 'cache')
+        cache = ResponseCache(directory)
+
+        with mock.patch('os.replace',
+                        side_effect=OSError(errno.ENOSPC, 'No space left')):
+            cache.store(self.url, self.resp)
+
+        self.assertIsNone(cache.get(self.url))
+        self.assertEqual(os.listdir(directory), [])
+
+    def test_get_mod(self):
+        path = os.path.join(self.tmp.name, 'cache')
+        open(path, 'w').close()
+
+        session = mock.Mock()
+        session.get.return_value = self.resp
+        api = API(session=session, cache=ResponseCache(path))
+
+        self.assertEqual(api.get_mod('foo').name, 'foo')
@@ -0,0 +1,137 @@
+import io
+import os
+import json
+import hashlib
+import tempfile
+from configparser import ConfigParser
+from contextlib import contextmanager, redirect_stdout
+from unittest import TestCase, mock
+from zipfile import ZipFile
+
+from fac.files import Config
+from fac.mods import ModManager
+from fac.utils import JSONDict, Version
+
+
+def make_zip(name, version):
+    data = io.BytesIO()
+    with ZipFile(data, 'w') as f:
+        f.writestr('%s_%s/info.json' % (name, version), json.dumps({
+            'name': name, 'version': version, 'factorio_version': '0.15',
+        }))
+    return data.getvalue()
+
+
+class FakeConfig(ConfigParser):
+    game_version_major = Version('0.15')
+    player_data = {'service-username': 'user', 'service-token': 'token'}
+    get_size = Config.get_size
+
+    def __init__(self, directory):
+        super().__init__(allow_no_value=True)
+        self.read_string(Config.default_config)
+        self.mods_directory = os.path.join(directory, 'mods')
+        self.factorio_write_path = directory
+        self.cache_dir = os.path.join(directory, 'cache')
+        self.hold = []
+        os.makedirs(self.mods_directory)
+
+
+class InstallerTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = FakeConfig(self.tmp.name)
+        self.manager = ModManager(self.config)
+        self.manager.load()
+        self.manager.fetch_release = self.fetch_release
+        self.fetched = []
+        self.fail = set()
+        self.files = {}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def release(self, name, version):
+        file_name = '%s_%s.zip' % (name, version)
+        data = self.files[file_name] = make_zip(name, version)
+        return (name, JSONDict({
+            'version': version,
+            'file_name': file_name,
+            'download_url': '/download/' + file_name,
+            'sha1': hashlib.sha1(data).hexdigest(),
+        }))
+
+    def fetch_release(self, release, file_path, player_data, progress=None,
+                      cancelled=None):
+        self.fetched.append(release.file_name)
+        if release.file_name in self.fail:
+            raise OSError("Connection reset")
+
+        with open(file_path, 'wb') as f:
+            f.write(self.files[release.file_name])
+
+    def install(self, *releases, **kwargs):
+        with redirect_stdout(io.StringIO()):
+            return self.manager.install_mods(list(releases), **kwargs)
+
+    def installed(self):
+        return sorted((mod.name, str(mod.version))
+                      for mod in self.manager.find_mods())
+
+
+class TestPipeline(InstallerTestCase):
+    def test_failed_download(self):
+        foo = self.release('foo', '1.0.0')
+        bar = self.release('bar', '1.0.0')
+        baz = self.release('baz', '1.0.0')
+        self.fail.add('bar_1.0.0.zip')
+
+        self.assertEqual(self.install(foo, bar, baz), [bar])
+        self.assertEqual(sorted(self.fetched),
+                         ['bar_1.0.0.zip', 'baz_1.0.0.zip', 'foo_1.0.0.zip'])
+        self.assertEqual(self.installed(),
+                         [('baz', '1.0.0'), ('foo', '1.0.0')])
+
+    def test_replace_version(self):
+        self.assertEqual(self.install(self.release('foo', '1.0.0')), [])
+        self.assertEqual(self.install(self.release('foo', '1.1.0')), [])
+
+        self.assertEqual(self.installed(), [('foo', '1.1.0')])
+        self.assertEqual(os.listdir(self.config.mods_directory),
+                         ['foo_1.1.0.zip'])
+
+    def test_mods_json_saved_once(self):
+        releases = [self.release(name, '1.0.0')
+                    for name in ('foo', 'bar', 'baz')]
+
+        with mock.patch.object(self.manager.mods_json, 'save') as save:
+            self.assertEqual(self.install(*releases, enable=False), [])
+
+        save.assert_called_once_with()
+        self.assertEqual(
+            [mod.name for mod in self.manager.find_mods() if mod.enabled],
+            []
+        )
+
+
+class TestStoreDownloads(InstallerTestCase):
+    def test_downloaded_meanwhile(self):
+        store = self.manager.release_store
+        release = self.release('foo', '1.0.0')
+        lock = store.lock
+
+        @contextmanager
+        def other_instance(release):
+            with lock(release):
+                # Finished downloading while we waited for the lock
+                path = store.download_path(release)
+                with open(path, 'wb') as f:
+                    f.write(self.files[release.file_name])
+                store.add(release.sha1, path)
+                yield
+
+        store.lock = other_instance
+
+        self.assertEqual(self.install(release), [])
+        self.assertEqual(self.fetched, [])
+        self.assertEqual(self.installed(), [('foo', '1.0.0')])
@@ -0,0 +1,91 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from fac import inventory
+from fac.mods import ModManager
+
+from test.test_installer import FakeConfig, make_zip
+
+
+class TestInventory(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = FakeConfig(self.tmp.name)
+        self.manager = ModManager(self.config)
+        self.manager.load()
+
+        self.write_zip('foo', '1.0.0')
+        self.write_zip('bar', '2.0.0')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_zip(self, name, version, file_name=None):
+        path = os.path.join(self.config.mods_directory,
+                            file_name or '%s_%s.zip' % (name, version))
+        with open(path, 'wb') as f:
+            f.write(make_zip(name, version))
+        return path
+
+    def scan(self):
+        """Scan with a new inventory, returning the mods and zips read"""
+
+        read = []
+        read_zip_info = inventory.read_zip_info
+
+        def counting_read_zip_info(path):
+            read.append(os.path.basename(path))
+            return read_zip_info(path)
+
+        with mock.patch('fac.inventory.read_zip_info',
+                        counting_read_zip_info):
+            mods = inventory.Inventory(self.manager).mods
+
+        return sorted((mod.name, str(mod.version)) for mod in mods), \
+            sorted(read)
+
+    def test_reuse(self):
+        mods = [('bar', '2.0.0'), ('foo', '1.0.0')]
+        self.assertEqual(self.scan(),
+                         (mods, ['bar_2.0.0.zip', 'foo_1.0.0.zip']))
+        self.assertEqual(self.scan(), (mods, []))
+
+    def test_modified(self):
+        self.scan()
+
+        # Same file name, different content
+        path = self.write_zip('foo', '1.0.10', 'foo_1.0.0.zip')
+        os.utime(path, ns=(0, 0))
+
+        self.assertEqual(self.scan(),
+                         ([('bar', '2.0.0'), ('foo', '1.0.10')],
+                          ['foo_1.0.0.zip']))
+
+    def test_corrupted_cache(self):
+        self.scan()
+
+        cache_file = inventory.Inventory(self.manager).cache_file
+        with open(cache_file, 'w') as f:
+            f.write('{"zips": ')
+
+        self.assertEqual(len(self.scan()[1]), 2)
+        self.assertEqual(self.scan()[1], [])
+
+    def test_unwritable_cache(self):
+        # A file where the cache directory should be
+        open(self.config.cache_dir, 'w').close()
+
+        self.assertEqual(self.scan(),
+                         ([('bar', '2.0.0'), ('foo', '1.0.0')],
+                          ['bar_2.0.0.zip', 'foo_1.0.0.zip']))
+
+    def test_invalidate(self):
+        inv = inventory.Inventory(self.manager)
+        self.assertEqual(len(inv.mods), 2)
+
+        self.write_zip('baz', '1.0.0')
+        self.assertEqual(len(inv.mods), 2)
+
+        inv.invalidate()
+        self.assertEqual(len(inv.mods), 3)
@@ -0,0 +1,360 @@
+import os
+import json
+import hashlib
+import tempfile
+from configparser import ConfigParser
+from unittest import TestCase, mock
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
+
+from fac.errors import ChecksumError
+from fac.files import Config, JSONFile
+from fac.mods import ModManager, ZippedMod, UnpackedMod
+from fac.utils import JSONDict, Version
+from fac import ziputils
+
+
+class FakeConfig(ConfigParser):
+    game_version_major = Version('0.15')
+
+    def __init__(self, mods_directory):
+        super().__init__(allow_no_value=True)
+        self.read_string(Config.default_config)
+        self.mods_directory = mods_directory
+
+
+class TestModList(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.tmp.name, 'mod-list.json')
+
+        with open(self.file, 'w') as f:
+            json.dump({'mods': [{'name': 'base', 'enabled': True}]}, f)
+
+        self.manager = ModManager(FakeConfig(self.tmp.name))
+        self.manager.load()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self):
+        with open(self.file) as f:
+            mods = json.load(f)['mods']
+        return {mod['name']: mod['enabled'] for mod in mods}
+
+    def test_enable(self):
+        self.assertTrue(self.manager.is_mod_enabled('foo'))
+        self.assertTrue(self.manager.set_mod_enabled('foo', False))
+        self.assertFalse(self.manager.set_mod_enabled('foo', False))
+        self.assertFalse(self.manager.is_mod_enabled('foo'))
+        self.assertEqual(self.read(), {'base': True, 'foo': False})
+        self.assertEqual(os.listdir(self.tmp.name), ['mod-list.json'])
+
+    def test_transaction(self):
+        with mock.patch.object(JSONFile, 'save', autospec=True,
+                               side_effect=JSONFile.save) as save:
+            with self.manager.transaction():
+                for i in range(10):
+                    self.manager.set_mod_enabled('mod%d' % i, False)
+
+                with self.manager.transaction():
+                    self.manager.set_mod_enabled('base', False)
+
+                self.assertEqual(save.call_count, 0)
+
+            self.assertEqual(save.call_count, 1)
+
+        mods = self.read()
+        self.assertEqual(len(mods), 11)
+        self.assertFalse(any(mods.values()))
+
+
+class TestPack(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manager = ModManager(FakeConfig(self.tmp.name))
+        self.location = os.path.join(self.tmp.name, 'foo_1.0.0')
+        self.files = {
+            'info.json': json.dumps({'name': 'foo', 'version': '1.0.0'}),
+            'data.lua': 'data:extend({})\n' * 1000,
+            'graphics/icon.png': '',
+        }
+
+        for name, content in self.files.items():
+            path = os.path.join(self.location, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(content)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_zip(self, path, compress_type):
+        with ZipFile(path) as f:
+            self.assertIsNone(f.testzip())
+            self.assertEqual(sorted(f.namelist()), [
+                'foo_1.0.0/data.lua',
+                'foo_1.0.0/graphics/icon.png',
+                'foo_1.0.0/info.json',
+            ])
+            for name, content in self.files.items():
+                info = f.getinfo('foo_1.0.0/' + name)
+                self.assertEqual(info.compress_type, compress_type)
+                self.assertEqual(f.read(info).decode(), content)
+
+            return f.getinfo('foo_1.0.0/data.lua').compress_size
+
+    def test_pack(self):
+        mod = UnpackedMod(self.manager, self.location)
+        packed = mod.pack()
+
+        self.assertEqual(packed.name, 'foo')
+        self.assertEqual(packed.toplevel, 'foo_1.0.0')
+        self.assertFalse(os.path.exists(self.location))
+
+        size = self.check_zip(packed.location, ZIP_DEFLATED)
+        self.assertLess(size, len(self.files['data.lua']) // 10)
+
+    def test_pack_stored(self):
+        mod = UnpackedMod(self.manager, self.location)
+        packed = mod.pack(keep=True, compression='stored')
+
+        self.assertTrue(os.path.isdir(self.location))
+        size = self.check_zip(packed.location, ZIP_STORED)
+        self.assertEqual(size, len(self.files['data.lua']))
+
+    def test_repack(self):
+        mod = UnpackedMod(self.manager, self.location)
+        mod.pack(keep=True)
+
+        # changed content, same size
+        data_lua = os.path.join(self.location, 'data.lua')
+        self.files['data.lua'] = self.files['data.lua'].replace('{}', '{ }', 1)
+        self.files['data.lua'] = self.files['data.lua'][:-1]
+        with open(data_lua, 'w') as f:
+            f.write(self.files['data.lua'])
+
+        # same content, new mtime
+        info_json = os.path.join(self.location, 'info.json')
+        st = os.stat(info_json)
+        os.utime(info_json, (st.st_atime, st.st_mtime + 10))
+
+        with mock.patch.object(ziputils, 'compress_file',
+                               wraps=ziputils.compress_file) as compress:
+            packed = mod.pack(replace=True, keep=True)
+
+        self.assertEqual([c[0][1] for c in compress.call_args_list],
+                         ['foo_1.0.0/data.lua'])
+        self.check_zip(packed.location, ZIP_DEFLATED)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)),
+                         ['foo_1.0.0', 'foo_1.0.0.zip'])
+
+
+class TestUnpack(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manager = ModManager(FakeConfig(self.tmp.name))
+        self.location = os.path.join(self.tmp.name, 'foo_1.0.0')
+        self.zip = self.location + '.zip'
+        self.files = {
+            'info.json': json.dumps({'name': 'foo', 'version': '1.0.0'}),
+            'data.lua': 'data:extend({})\n',
+            'graphics/icon.png': 'png',
+        }
+
+        with ZipFile(self.zip, 'w') as f:
+            for name, content in self.files.items():
+                f.writestr('foo_1.0.0/' + name, content)
+            f.writestr('other/file', '')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_tree(self):
+        tree = {}
+        for root, dirs, files in os.walk(self.location):
+            for name in files:
+                path = os.path.join(root, name)
+                with open(path) as f:
+                    tree[os.path.relpath(path, self.location)] = f.read()
+        return tree
+
+    def unpack(self, **kwargs):
+        return ZippedMod(self.manager, self.zip).unpack(**kwargs)
+
+    def test_unpack(self):
+        mod = self.unpack()
+        self.assertEqual(mod.location, self.location)
+        self.assertFalse(os.path.exists(self.zip))
+        self.assertEqual(self.read_tree(), self.files)
+
+    def test_unpack_threads(self):
+        with mock.patch('os.cpu_count', return_value=4):
+            self.unpack()
+        self.assertEqual(self.read_tree(), self.files)
+
+    def test_unpack_replace(self):
+        self.unpack(keep=True)
+
+        def path(name):
+            return os.path.join(self.location, name)
+
+        # unchanged file
+        info_json = path('info.json')
+        os.utime(info_json, (0, 0))
+
+        # modified file, extra files and directory
+        with open(path('data.lua'), 'w') as f:
+            f.write('data:extend({ })\n')
+        for name in ('extra.lua', 'graphics/extra.png', 'old/old.png'):
+            os.makedirs(os.path.dirname(path(name)), exist_ok=True)
+            with open(path(name), 'w') as f:
+                f.write('extra')
+
+        self.unpack(replace=True)
+
+        self.assertEqual(self.read_tree(), self.files)
+        self.assertEqual(os.stat(info_json).st_mtime, 0)
+        self.assertFalse(os.path.exists(path('old')))
+
+    def test_update_info(self):
+        mod = ZippedMod(self.manager, self.zip)
+        with ZipFile(self.zip) as f:
+            before = {info.filename: (info.CRC, info.compress_size)
+                      for info in f.infolist()}
+
+        mod.update_info(factorio_version='0.15')
+        self.assertEqual(mod.info.factorio_version, '0.15')
+
+        with ZipFile(self.zip) as f:
+            self.assertIsNone(f.testzip())
+            after = {info.filename: (info.CRC, info.compress_size)
+                     for info in f.infolist()}
+            info = json.loads(f.read('foo_1.0.0/info.json').decode())
+
+        self.assertEqual(info['factorio_version'], '0.15')
+        self.assertEqual(info['name'], 'foo')
+        self.assertNotEqual(after.pop('foo_1.0.0/info.json'),
+                            before.pop('foo_1.0.0/info.json'))
+        self.assertEqual(after, before)
+        self.assertEqual(os.listdir(self.tmp.name), ['foo_1.0.0.zip'])
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=b'', headers=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = dict(headers or {})
+        self.headers.setdefault('content-length', str(len(data)))
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i:i + chunk_size]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise OSError("HTTP error %d" % self.status_code)
+
+    def close(self):
+        pass
+
+
+class TestFetchRelease(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manager = ModManager(FakeConfig(self.tmp.name),
+                                  api=mock.Mock(base_url='https://x/api/'))
+
+        self.data = os.urandom(1000)
+        self.release = JSONDict({
+            'file_name': 'foo_1.0.0.zip',
+            'download_url': '/download/foo',
+            'sha1': hashlib.sha1(self.data).hexdigest(),
+        })
+        self.file = os.path.join(self.tmp.name, 'foo_1.0.0.zip')
+        self.part = self.file + '.part'
+        self.player_data = {'service-username': 'u', 'service-token': 't'}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def partial(self, size=400, etag='"v1"', last_modified=None):
+        with open(self.part, 'wb') as f:
+            f.write(self.data[:size])
+
+        with JSONFile(self.part + '.json') as state:
+            state.download_url = self.release.download_url
+            state.length = len(self.data)
+            state.etag = etag
+            state.last_modified = last_modified
+
+    def fetch(self, *responses):
+        self.manager.api.get.side_effect = list(responses)
+        self.manager.fetch_release(self.release, self.file, self.player_data)
+        return [call[1]['headers']
+                for call in self.manager.api.get.call_args_list]
+
+    def assertFetched(self):
+        with open(self.file, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertFalse(os.path.exists(self.part))
+        self.assertFalse(os.path.exists(self.part + '.json'))
+
+    def test_resume(self):
+        self.partial()
+        headers = self.fetch(FakeResponse(206, self.data[400:], {
+            'content-range': 'bytes 400-999/1000',
+        }))
+
+        self.assertEqual(headers, [{'Range': 'bytes=400-',
+                                    'If-Range': '"v1"'}])
+        self.assertFetched()
+
+    def test_range_ignored(self):
+        self.partial()
+        self.fetch(FakeResponse(200, self.data))
+        self.assertFetched()
+
+    def test_range_not_satisfiable(self):
+        self.partial()
+        headers = self.fetch(FakeResponse(416), FakeResponse(200, self.data))
+
+        self.assertEqual(headers[1], {})
+        self.assertFetched()
+
+    def test_wrong_range(self):
+        self.partial()
+        headers = self.fetch(
+            FakeResponse(206, self.data[300:], {
+                'content-range': 'bytes 300-999/1000',
+            }),
+            FakeResponse(200, self.data),
+        )
+
+        self.assertEqual(headers[1], {})
+        self.assertFetched()
+
+    def test_weak_etag(self):
+        date = 'Sun, 01 Jan 2017 00:00:00 GMT'
+        self.partial(etag='W/"v1"', last_modified=date)
+        headers = self.fetch(FakeResponse(206, self.data[400:], {
+            'content-range': 'bytes 400-999/1000',
+        }))
+
+        self.assertEqual(headers[0]['If-Range'], date)
+        self.assertFetched()
+
+        # No usable validator: start from scratch
+        self.partial(etag='W/"v1"')
+        self.manager.api.get.reset_mock()
+        headers = self.fetch(FakeResponse(200, self.data))
+
+        self.assertEqual(headers, [{}])
+        self.assertFetched()
+
+    def test_checksum_mismatch(self):
+        self.release.sha1 = '0' * 40
+
+        with self.assertRaises(ChecksumError):
+            self.fetch(FakeResponse(200, self.data))
+
+        self.assertEqual(os.listdir(self.tmp.name), [])
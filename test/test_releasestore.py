@@ -0,0 +1,163 @@
+import os
+import sys
+import time
+import tempfile
+import subprocess
+from unittest import TestCase, skipIf
+
+from fac import releasestore
+from fac.releasestore import ReleaseStore
+from fac.utils import JSONDict
+
+SHA1 = 'da39a3ee5e6b4b0d3255bfef95601890afd80709'
+
+
+class TestReleaseStore(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ReleaseStore(os.path.join(self.tmp.name, 'store'))
+        self.mods_dir = os.path.join(self.tmp.name, 'mods')
+        os.makedirs(self.mods_dir)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_add_install(self):
+        self.assertIsNone(self.store.get(SHA1))
+
+        release = JSONDict({'file_name': 'foo_1.0.0.zip'})
+        download = self.store.download_path(release)
+        with open(download, 'w') as f:
+            f.write('foo')
+
+        path = self.store.add(SHA1, download)
+        self.assertEqual(self.store.get(SHA1), path)
+        self.assertFalse(os.path.exists(download))
+
+        dest = os.path.join(self.mods_dir, 'foo_1.0.0.zip')
+        for i in range(2):
+            self.store.install(path, dest)
+
+        self.assertTrue(os.path.samefile(path, dest))
+        self.assertEqual(os.listdir(self.mods_dir), ['foo_1.0.0.zip'])
+
+    def test_mods_directories(self):
+        self.assertEqual(self.store.mods_directories, [])
+
+        for i in range(2):
+            self.store.register_mods_directory(self.mods_dir)
+
+        self.assertEqual(self.store.mods_directories, [self.mods_dir])
+
+    @skipIf(releasestore.fcntl is None, "no file locking")
+    def test_lock(self):
+        release = JSONDict({'file_name': 'foo_1.0.0.zip'})
+        lock_file = self.store.download_path(release) + '.lock'
+        try_lock = (
+            "import fcntl, sys\n"
+            "f = open(sys.argv[1], 'ab')\n"
+            "fcntl.lockf(f, fcntl.LOCK_EX | fcntl.LOCK_NB)\n"
+        )
+
+        with self.store.lock(release):
+            # Held by another process
+            self.assertNotEqual(subprocess.call(
+                [sys.executable, '-c', try_lock, lock_file],
+                stderr=subprocess.DEVNULL
+            ), 0)
+
+        self.assertFalse(os.path.exists(lock_file))
+
+        with self.store.lock(release):
+            pass
+
+
+class TestGC(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.mods_dir = os.path.join(self.tmp.name, 'mods')
+        self.write_tmp = os.path.join(self.tmp.name, 'write-tmp')
+        os.makedirs(self.mods_dir)
+        os.makedirs(self.write_tmp)
+
+        self.store = ReleaseStore(
+            os.path.join(self.tmp.name, 'store'),
+            size_limit=2500, partial_max_age=3600, gc_interval=3600,
+            tmp_dirs=[self.write_tmp],
+        )
+        self.store.register_mods_directory(self.mods_dir)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add(self, name, size=1000):
+        release = JSONDict({'file_name': '%s_1.0.0.zip' % name})
+        path = self.store.download_path(release)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+
+        sha1 = name * 40
+        path = self.store.add(sha1, path)
+        dest = os.path.join(self.mods_dir, release.file_name)
+        self.store.install(path, dest)
+        return sha1, dest
+
+    def partial(self, directory, name, age):
+        path = os.path.join(directory, name)
+        with open(path, 'w') as f:
+            f.write('partial')
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+
+    def test_gc(self):
+        a, a_dest = self.add('a')
+        b, b_dest = self.add('b')
+        c, c_dest = self.add('c')
+        self.store.flush()
+
+        # a is the least recently used, but still installed
+        os.remove(b_dest)
+        os.remove(c_dest)
+
+        self.partial(self.store.tmp_dir, 'old_1.0.0.zip.part', 7200)
+        self.partial(self.store.tmp_dir, 'new_1.0.0.zip.part', 60)
+        self.partial(self.write_tmp, 'old_1.0.0.zip.part.json', 7200)
+        self.partial(self.write_tmp, 'other.zip', 7200)
+
+        result = self.store.gc()
+        self.assertEqual(result.releases, 1)
+        self.assertEqual(result.partials, 2)
+
+        self.assertEqual([entry.sha1 for entry in self.store.entries()],
+                         [a, c])
+        self.assertEqual([os.path.basename(path) for path, size, mtime
+                          in self.store.partial_files()],
+                         ['new_1.0.0.zip.part'])
+
+        # Already ran recently
+        self.assertIsNone(self.store.maybe_gc())
+
+        result = self.store.gc(size_limit=1)
+        self.assertEqual(result.releases, 1)
+        self.assertEqual([entry.sha1 for entry in self.store.entries()],
+                         [a])
+
+    def test_clear(self):
+        a, a_dest = self.add('a')
+        self.partial(self.write_tmp, 'old_1.0.0.zip.part', 7200)
+        self.partial(self.store.tmp_dir, 'new_1.0.0.zip.part', 0)
+        self.partial(self.write_tmp, 'other.zip', 7200)
+
+        result = self.store.clear()
+        self.assertEqual((result.releases, result.partials), (1, 1))
+        self.assertEqual(self.store.entries(), [])
+
+        # Possibly still being downloaded
+        self.assertEqual([os.path.basename(path) for path, size, mtime
+                          in self.store.partial_files()],
+                         ['new_1.0.0.zip.part'])
+        self.assertTrue(os.path.exists(os.path.join(self.write_tmp,
+                                                    'other.zip')))
+
+        with open(a_dest, 'rb') as f:
+            self.assertEqual(f.read(), b'x' * 1000)
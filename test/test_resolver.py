@@ -0,0 +1,182 @@
+from unittest import TestCase
+
+from fac.errors import ModNotFoundError, ResolutionError
+from fac.resolver import Resolver
+from fac.utils import JSONDict, Version, parse_requirement
+
+
+def release(version, *dependencies, factorio='0.15'):
+    return {
+        'version': version,
+        'info_json': {
+            'factorio_version': factorio,
+            'dependencies': list(dependencies),
+        },
+    }
+
+
+class FakeMod:
+    def __init__(self, name, version, *dependencies):
+        self.info = JSONDict({
+            'name': name,
+            'version': version,
+            'factorio_version': '0.15',
+            'dependencies': list(dependencies),
+        })
+        self.name = name
+        self.version = Version(version)
+        self.game_version = Version('0.15')
+
+
+class FakeAPI:
+    def __init__(self, mods):
+        self.mods = mods
+        self.requests = []
+
+    def get_mod(self, name):
+        self.requests.append(name)
+        if name not in self.mods:
+            raise ModNotFoundError(name)
+        return JSONDict({'name': name, 'releases': self.mods[name]})
+
+
+class FakeConfig:
+    game_version_major = Version('0.15')
+
+
+class FakeManager:
+    def __init__(self, remote, installed=()):
+        self.api = FakeAPI(remote)
+        self.config = FakeConfig()
+        self.installed = list(installed)
+
+    def find_mods(self):
+        return self.installed
+
+
+class TestResolver(TestCase):
+    def resolve(self, manager, *requirements, **kwargs):
+        resolver = self.resolver = Resolver(manager, **kwargs)
+        plan = resolver.resolve([parse_requirement(req)
+                                 for req in requirements])
+        return [(name, release.version) for name, release in plan]
+
+    def test_latest(self):
+        manager = FakeManager({
+            'a': [release('1.0.0', 'b'), release('1.1.0', 'b >= 1.0')],
+            'b': [release('1.0.0'), release('0.9.0')],
+        })
+        self.assertEqual(self.resolve(manager, 'a'),
+                         [('a', '1.1.0'), ('b', '1.0.0')])
+
+    def test_installed(self):
+        manager = FakeManager({
+            'a': [release('1.0.0', 'b >= 0.5')],
+            'b': [release('1.0.0')],
+        }, [FakeMod('b', '0.9.0')])
+        self.assertEqual(self.resolve(manager, 'a'), [('a', '1.0.0')])
+        self.assertEqual(manager.api.requests, ['a'])
+
+    def test_upgrade_installed(self):
+        manager = FakeManager({
+            'a': [release('1.0.0', 'b >= 1.0')],
+            'b': [release('1.0.0')],
+        }, [FakeMod('b', '0.9.0')])
+        self.assertEqual(self.resolve(manager, 'a'),
+                         [('a', '1.0.0'), ('b', '1.0.0')])
+
+    def test_held(self):
+        manager = FakeManager({
+            'a': [release('1.0.0', 'b >= 1.0')],
+            'b': [release('1.0.0')],
+        }, [FakeMod('b', '0.9.0')])
+        with self.assertRaises(ResolutionError):
+            self.resolve(manager, 'a', held=['b'])
+
+    def test_backtrack(self):
+        manager = FakeManager({
+            'a': [release('2.0.0', 'c >= 2.0'), release('1.0.0', 'c')],
+            'b': [release('1.0.0', 'c < 2.0')],
+            'c': [release('2.0.0'), release('1.0.0')],
+        })
+        self.assertEqual(self.resolve(manager, 'b', 'a'),
+                         [('b', '1.0.0'), ('a', '1.0.0'), ('c', '1.0.0')])
+
+    def test_incompatible(self):
+        manager = FakeManager({
+            'a': [release('2.0.0', '! b'), release('1.0.0')],
+            'b': [release('1.0.0')],
+        }, [FakeMod('b', '1.0.0')])
+        self.assertEqual(self.resolve(manager, 'a'), [('a', '1.0.0')])
+        self.assertEqual(self.resolver.warnings, [])
+
+        # Installed mods never prevent installing the requested ones
+        self.assertEqual(self.resolve(manager, 'a>=2.0'), [('a', '2.0.0')])
+        self.assertEqual(self.resolver.warnings,
+                         ['b is incompatible with a 2.0.0'])
+
+    def test_optional(self):
+        manager = FakeManager({
+            'a': [release('1.0.0', '? b >= 1.0', '? c')],
+            'b': [release('1.0.0')],
+        }, [FakeMod('b', '0.5.0')])
+        self.assertEqual(self.resolve(manager, 'a'),
+                         [('a', '1.0.0'), ('b', '1.0.0')])
+        self.assertNotIn('c', manager.api.requests)
+
+    def test_missing(self):
+        manager = FakeManager({
+            'a': [release('1.0.0', 'missing')],
+        })
+        with self.assertRaisesRegex(ResolutionError, 'missing was not found'):
+            self.resolve(manager, 'a')
+
+    def test_game_version(self):
+        manager = FakeManager({
+            'a': [release('2.0.0', factorio='0.16'), release('1.0.0')],
+        })
+        self.assertEqual(self.resolve(manager, 'a'), [('a', '1.0.0')])
+        self.assertEqual(self.resolve(manager, 'a', ignore_game_ver=True),
+                         [('a', '2.0.0')])
+
+    def test_broken_installed(self):
+        manager = FakeManager({
+            'a': [release('1.0.0', 'local')],
+            'gamma': [release('1.0.0')],
+        }, [
+            FakeMod('local', '1.0.0', 'nosuch'),
+            FakeMod('x', '1.0.0', '! y'),
+            FakeMod('y', '1.0.0'),
+        ])
+
+        for req in 'gamma', 'a':
+            self.assertEqual(self.resolve(manager, req), [(req, '1.0.0')])
+            self.assertEqual(self.resolver.warnings, [
+                'nosuch was not found (required by local)',
+                'y is incompatible with x 1.0.0',
+            ])
+
+    def test_installed_dependencies(self):
+        manager = FakeManager({
+            'b': [release('1.0.0', 'c')],
+            'c': [release('1.0.0')],
+            'gamma': [release('1.0.0')],
+        }, [FakeMod('a', '1.0.0', 'b')])
+        self.assertEqual(self.resolve(manager, 'gamma'),
+                         [('gamma', '1.0.0'), ('b', '1.0.0'), ('c', '1.0.0')])
+        self.assertEqual(self.resolve(manager), [('b', '1.0.0'),
+                                                 ('c', '1.0.0')])
+
+    def test_protect_installed(self):
+        manager = FakeManager({
+            'a': [release('2.0.0', 'c >= 2.0'), release('1.0.0', 'c')],
+            'c': [release('2.0.0'), release('1.0.0')],
+        }, [FakeMod('b', '1.0.0', 'c < 2.0'), FakeMod('c', '1.0.0')])
+        self.assertEqual(self.resolve(manager, 'a'), [('a', '1.0.0')])
+        self.assertEqual(self.resolver.warnings, [])
+
+        self.assertEqual(self.resolve(manager, 'a>=2.0'),
+                         [('a', '2.0.0'), ('c', '2.0.0')])
+        self.assertEqual(self.resolver.warnings, [
+            'b 1.0.0 requires c<2.0, but c 2.0.0 is selected'
+        ])
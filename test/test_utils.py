@@ -1,7 +1,10 @@
 from unittest import TestCase
 import json
 
-from fac.utils import JSONDict, JSONList
+from fac.utils import (JSONDict, JSONList, parse_size, format_size,
+                       iter_json_array, parse_requirement,
+                       Version, parse_version, parse_game_version,
+                       sort_releases)
 
 
 class TestJSONDict(TestCase):
@@ -35,6 +38,15 @@ class TestJSONDict(TestCase):
         with self.assertRaises(AttributeError):
             self.d.qux.nope
 
+    def test_cached_children(self):
+        self.assertIs(self.d.qux, self.d.qux)
+        self.assertIs(self.d.baz, self.d.baz)
+
+        qux = self.d.qux
+        self.d.qux = {'lok': 4}
+        self.assertIsNot(self.d.qux, qux)
+        self.assertEqual(self.d.qux.lok, 4)
+
 
 class TestJSONList(TestCase):
     def setUp(self):
@@ -62,3 +74,89 @@ class TestJSONList(TestCase):
         self.assertEqual(self.d.foo[2].baz, 10)
         self.d.foo.insert(0, {'qux': 20})
         self.assertEqual(self.d.foo[0].qux, 20)
+
+
+class TestParseSize(TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_size('512'), 512)
+        self.assertEqual(parse_size('10K'), 10 * 1024)
+        self.assertEqual(parse_size('50M'), 50 * 1024 ** 2)
+        self.assertEqual(parse_size('1.5GiB'), 3 * 1024 ** 3 // 2)
+        self.assertEqual(parse_size(' 2 gb '), 2 * 1024 ** 3)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_size('lots')
+
+    def test_format(self):
+        self.assertEqual(format_size(512), '512')
+        self.assertEqual(format_size(1536), '1.5K')
+        self.assertEqual(format_size(50 * 1024 ** 2), '50.0M')
+        self.assertEqual(format_size(3 * 1024 ** 4), '3.0T')
+        self.assertEqual(parse_size(format_size(2 * 1024 ** 3)),
+                         2 * 1024 ** 3)
+
+
+class TestIterJSONArray(TestCase):
+    def setUp(self):
+        self.results = [{'name': 'foo', 'n': 12345}, {'name': 'bär'}, [], 3]
+        self.data = json.dumps({
+            'pagination': {'count': 4, 'links': {'next': None}},
+            'results': self.results,
+            'count': 1234567,
+        }).encode('utf-8')
+
+    def test_chunk_sizes(self):
+        for size in (1, 2, 7, 1024):
+            chunks = [self.data[i:i + size]
+                      for i in range(0, len(self.data), size)]
+            self.assertEqual(list(iter_json_array(chunks, 'results')),
+                             self.results)
+
+    def test_missing_key(self):
+        self.assertEqual(list(iter_json_array([b'{"a": [1]}'], 'results')),
+                         [])
+        self.assertEqual(list(iter_json_array([b' {} '], 'results')), [])
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_json_array([b'{"results": []}'],
+                                              'results')), [])
+
+    def test_truncated(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array([self.data[:-10]], 'results'))
+
+
+class TestVersion(TestCase):
+    def test_compare_str(self):
+        self.assertTrue(Version('0.15') < '0.16')
+        self.assertTrue('0.15.1' > Version('0.15'))
+        self.assertTrue(Version('0.15.0') == '0.15')
+        self.assertFalse(Version('0.15') != '0.15.0')
+
+    def test_interned(self):
+        self.assertIs(parse_version('1.2.3'), parse_version('1.2.3'))
+        self.assertEqual(parse_version('1.2.3'), Version('1.2.3'))
+
+    def test_shared_specifier(self):
+        foo = parse_requirement('foo >= 1.0')
+        bar = parse_requirement('bar>= 1.0')
+        self.assertEqual(foo.name, 'foo')
+        self.assertIs(foo.specifier, bar.specifier)
+        self.assertIn('1.2', foo.specifier)
+
+    def test_game_version(self):
+        self.assertEqual(parse_game_version({'factorio_version': '0.15'}),
+                         '0.15')
+        self.assertEqual(parse_game_version(JSONDict({
+            'info_json': {'factorio_version': '0.16.1'}
+        })), '0.16')
+        self.assertEqual(parse_game_version({}), '0.12')
+
+    def test_sort_releases(self):
+        releases = [{'version': v, 'i': i}
+                    for i, v in enumerate(['1.2', '1.10', '0.9', '1.2.0'])]
+        self.assertEqual([r['i'] for r in sort_releases(releases)],
+                         [1, 0, 3, 2])
+        self.assertEqual([r['i'] for r in sort_releases(releases, False)],
+                         [2, 0, 3, 1])